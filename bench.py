@@ -0,0 +1,279 @@
+"""Load generator for the Todo API (``python todo.py bench``).
+
+Seeds a store with N todos spread across the categories, then replays a
+weighted mix of list/create/toggle/delete requests against ``server:app``
+either in-process (through httpx's ASGI transport) or over loopback (a
+uvicorn subprocess).  Load is either closed-loop (a fixed number of
+concurrent clients) or open-loop (a fixed arrival rate, latency measured
+from the scheduled start so queueing is not hidden).  Results are printed
+as JSON so runs can be diffed between commits.
+
+Examples:
+    python todo.py bench --seed 10000 --requests 5000 --concurrency 32
+    python todo.py bench --store postgres --target loopback --rate 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "list=70,create=10,toggle=15,delete=5"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("list", "create", "toggle", "delete"):
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float) -> dict:
+    endpoints = {}
+    for name in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies.get(name, []))
+        endpoints[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "mean_ms": sum(values) / len(values) if values else 0.0,
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+        }
+    everything = sorted(v for values in latencies.values() for v in values)
+    return {
+        "elapsed_s": elapsed,
+        "total": {
+            "count": len(everything),
+            "errors": sum(errors.values()),
+            "rps": len(everything) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(everything, 50),
+            "p95_ms": percentile(everything, 95),
+            "p99_ms": percentile(everything, 99),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def seed(models, count: int) -> list[int]:
+    """Insert ``count`` todos in batched transactions; returns their ids."""
+    models.init_db()
+    ids = []
+    for start in range(0, count, 1000):
+        ops = [
+            {"op": "create", "title": f"bench todo {i}", "category": random.choice(models.CATEGORIES)}
+            for i in range(start, min(count, start + 1000))
+        ]
+        ids.extend(row["id"] for row in models.apply_batch(ops))
+    return ids
+
+
+class Workload:
+    """Picks operations by weight and tracks which ids still exist."""
+
+    def __init__(self, mix: dict[str, float], ids: list[int], categories: list[str]) -> None:
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.ids = list(ids)
+        self.categories = categories
+        self.latencies = {name: [] for name in self.names}
+        self.errors = {}
+
+    async def one(self, client, scheduled: float | None = None) -> None:
+        name = random.choices(self.names, self.weights)[0]
+        if name in ("toggle", "delete") and not self.ids:
+            name = "create"
+        category = random.choice(self.categories)
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            if name == "list":
+                resp = await client.get("/api/todos", params={"category": category, "limit": 50})
+            elif name == "create":
+                resp = await client.post("/api/todos", json={"title": "bench", "category": category})
+                if resp.status_code == 201:
+                    self.ids.append(resp.json()["todo"]["id"])
+            elif name == "toggle":
+                resp = await client.put(f"/api/todos/{random.choice(self.ids)}", json={})
+            else:
+                todo_id = self.ids.pop(random.randrange(len(self.ids)))
+                resp = await client.delete(f"/api/todos/{todo_id}")
+            ok = resp.status_code < 400
+        except Exception:
+            ok = False
+        if ok:
+            self.latencies[name].append((time.perf_counter() - start) * 1000)
+        else:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def closed_loop(client, workload: Workload, concurrency: int, requests: int, deadline: float) -> None:
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0 and time.perf_counter() < deadline:
+            remaining -= 1
+            await workload.one(client)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(client, workload: Workload, rate: float, requests: int, deadline: float,
+                    max_in_flight: int) -> None:
+    interval = 1.0 / rate
+    in_flight = set()
+    next_at = time.perf_counter()
+    for _ in range(requests):
+        if next_at >= deadline:
+            break
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        task = asyncio.create_task(workload.one(client, scheduled=next_at))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        next_at += random.expovariate(1.0 / interval)
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+
+async def drive(args, workload: Workload, base_url: str | None) -> float:
+    import httpx
+
+    if base_url is None:
+        import server
+        transport = httpx.ASGITransport(app=server.app)
+        base_url = "http://bench"
+    else:
+        transport = None
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight))
+    deadline = time.perf_counter() + args.duration if args.duration else float("inf")
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(client, workload, args.rate, args.requests, deadline, args.max_in_flight)
+        else:
+            await closed_loop(client, workload, args.concurrency, args.requests, deadline)
+        return time.perf_counter() - start
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int) -> subprocess.Popen:
+    import httpx
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_DIR, env=os.environ.copy(),
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="todo.py bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--store", choices=["sqlite", "postgres"], default="sqlite",
+                        help="postgres uses DATABASE_URL; sqlite uses a scratch file unless --db is given")
+    parser.add_argument("--db", help="SQLite file to use instead of a scratch file")
+    parser.add_argument("--target", choices=["inprocess", "loopback"], default="inprocess")
+    parser.add_argument("--seed", type=int, default=10_000, help="todos to insert before the run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients for closed-loop load")
+    parser.add_argument("--rate", type=float, help="requests/second for open-loop load")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--no-cache", action="store_true", help="disable the get_todos read cache")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # models.py picks its backend at import time, so configure it first.
+    scratch = None
+    if args.store == "postgres":
+        if not os.environ.get("DATABASE_URL"):
+            parser.error("--store postgres needs DATABASE_URL")
+    else:
+        os.environ.pop("DATABASE_URL", None)
+        if args.db:
+            os.environ["TODO_DB_PATH"] = os.path.abspath(args.db)
+        else:
+            scratch = tempfile.TemporaryDirectory()
+            os.environ["TODO_DB_PATH"] = os.path.join(scratch.name, "bench.db")
+    if args.no_cache:
+        os.environ["TODO_CACHE_TTL"] = "0"
+    sys.path.insert(0, PROJECT_DIR)
+
+    import models
+
+    ids = seed(models, args.seed)
+    workload = Workload(args.mix, ids, models.CATEGORIES)
+
+    proc = None
+    base_url = None
+    if args.target == "loopback":
+        models.close_pool()
+        port = _free_port()
+        proc = _start_server(port)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        elapsed = asyncio.run(drive(args, workload, base_url))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        models.close_pool()
+        if scratch is not None:
+            scratch.cleanup()
+
+    report = summarize(workload.latencies, workload.errors, elapsed)
+    report["config"] = {
+        "store": args.store, "target": args.target, "seed": args.seed, "mix": args.mix,
+        "requests": args.requests, "duration": args.duration,
+        "mode": "open" if args.rate else "closed",
+        "concurrency": None if args.rate else args.concurrency, "rate": args.rate,
+        "cache": not args.no_cache,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
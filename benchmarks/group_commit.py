@@ -0,0 +1,118 @@
+"""SQLite write throughput: group commit vs one transaction per write.
+
+Starts ``--workers`` processes (standing in for uvicorn workers) against
+one throwaway database file, each running ``--threads`` threads that
+alternate ``add_todo`` and ``toggle_todo`` for ``--duration`` seconds.
+Runs once with TODO_GROUP_COMMIT_MS=0 (every write commits on its own
+pooled connection) and once per ``--window``, and reports writes/s, the
+p50/p99 write latency and how many writes failed (e.g. ``database is
+locked`` once busy_timeout runs out).
+
+Usage:
+    python benchmarks/group_commit.py [--workers 4] [--threads 8] [--duration 5]
+        [--window 1 2 5] [--synchronous NORMAL|FULL]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child(threads: int, duration: float, synchronous: str) -> None:
+    # Runs in a subprocess: models.py reads its settings at import.
+    sys.path.insert(0, ROOT)
+    import models
+
+    models._PRAGMAS = tuple(p for p in models._PRAGMAS if "synchronous" not in p) + (
+        f"PRAGMA synchronous={synchronous}",
+    )
+    models.init_db()
+    latencies, errors = [], []
+    start_at = float(os.environ["BENCH_START_AT"])
+
+    def worker(n: int) -> None:
+        time.sleep(max(start_at - time.time(), 0))
+        deadline = time.monotonic() + duration
+        todo_id = None
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                if todo_id is None:
+                    todo_id = models.add_todo(f"bench {n}", models.CATEGORIES[n % 3])["id"]
+                else:
+                    models.toggle_todo(todo_id)
+                    todo_id = None
+            except Exception as exc:
+                errors.append(type(exc).__name__)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    models.shutdown()
+    print(json.dumps({"latencies": latencies, "errors": len(errors)}))
+
+
+def _run(label: str, window: float, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, TODO_DB_PATH=os.path.join(tmp, "bench.db"), TODO_METRICS="0",
+                   TODO_CACHE_TTL="0", TODO_GROUP_COMMIT_MS=str(window),
+                   BENCH_START_AT=str(time.time() + 2))
+        env.pop("DATABASE_URL", None)
+        # Create the schema once so the workers don't race the migrations.
+        subprocess.run([sys.executable, "-c", "import models; models.init_db()"],
+                       cwd=ROOT, env=env, check=True)
+        procs = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--child", "--threads", str(args.threads),
+                 "--duration", str(args.duration), "--synchronous", args.synchronous],
+                env=env, stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(args.workers)
+        ]
+        results = [json.loads(proc.communicate()[0]) for proc in procs]
+    latencies = sorted(ms for r in results for ms in r["latencies"])
+    errors = sum(r["errors"] for r in results)
+    if not latencies:
+        print(f"{label:<14} no successful writes, {errors} errors")
+        return
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<14} {len(latencies) / args.duration:>10.0f} "
+          f"{statistics.median(latencies) * 1000:>9.2f} {p99 * 1000:>9.2f} {errors:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--window", type=float, nargs="+", default=[1, 2, 5], help="group-commit ms")
+    parser.add_argument("--synchronous", choices=["NORMAL", "FULL"], default="NORMAL")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.threads, args.duration, args.synchronous)
+        return
+
+    print(f"{args.workers} workers x {args.threads} threads, {args.duration:g}s, "
+          f"synchronous={args.synchronous}")
+    print(f"{'mode':<14} {'writes/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    _run("per-call", 0, args)
+    for window in args.window:
+        _run(f"group {window:g}ms", window, args)
+
+
+if __name__ == "__main__":
+    main()
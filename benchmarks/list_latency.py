@@ -0,0 +1,98 @@
+"""List-query latency before and after the category indexes (migrations 3-4).
+
+Seeds a throwaway SQLite database with N todos spread across the
+categories, times the ``get_todos`` query with the schema at migration 2
+(no secondary indexes), applies the remaining migrations and times it
+again.  Both the full category list and a first page of 50 rows are
+measured, since the index mostly saves the sort.
+
+Usage:
+    python benchmarks/list_latency.py [--rows 10000 100000 1000000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+CATEGORIES = ["Ruofei", "Ruiqi", "Family"]
+
+QUERIES = {
+    "full": "SELECT id, title, completed, category, created_at FROM todos "
+            "WHERE category = ? ORDER BY created_at DESC",
+    "first_50": "SELECT id, title, completed, category, created_at FROM todos "
+                "WHERE category = ? ORDER BY created_at DESC LIMIT 50",
+}
+
+
+def seed(conn: sqlite3.Connection, rows: int) -> None:
+    rng = random.Random(rows)
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(rows):
+        created = start + timedelta(seconds=rng.randrange(5 * 365 * 86400))
+        batch.append((f"todo {i}", rng.random() < 0.5, rng.choice(CATEGORIES),
+                      created.strftime("%Y-%m-%d %H:%M:%S")))
+        if len(batch) == 10_000:
+            conn.executemany(
+                "INSERT INTO todos (title, completed, category, created_at) VALUES (?, ?, ?, ?)", batch
+            )
+            batch.clear()
+    if batch:
+        conn.executemany(
+            "INSERT INTO todos (title, completed, category, created_at) VALUES (?, ?, ?, ?)", batch
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def time_query(conn: sqlite3.Connection, sql: str, repeat: int) -> float:
+    """Median wall time in milliseconds, rows fully fetched."""
+    samples = []
+    for _ in range(repeat):
+        category = random.choice(CATEGORIES)
+        start = time.perf_counter()
+        conn.execute(sql, (category,)).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run(rows: int, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        migrations.migrate(conn, migrations.SQLITE, target=2)
+        seed(conn, rows)
+        before = {name: time_query(conn, sql, repeat) for name, sql in QUERIES.items()}
+        migrations.migrate(conn, migrations.SQLITE)
+        conn.execute("ANALYZE")
+        after = {name: time_query(conn, sql, repeat) for name, sql in QUERIES.items()}
+        conn.close()
+    return {"rows": rows, "before": before, "after": after}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'query':<9} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for rows in args.rows:
+        result = run(rows, args.repeat)
+        for name in QUERIES:
+            before, after = result["before"][name], result["after"][name]
+            print(f"{rows:>10}  {name:<9} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Title search latency as the table grows: FTS index vs a LIKE scan.
+
+For each size, seeds a throwaway SQLite database with N todos whose
+titles are drawn from a fixed vocabulary, plus 20 that contain a rare
+word.  Times ``models.search_todos`` for a first page of 50 against the
+equivalent ``LIKE '%word%'`` scan, for the rare word (a fixed number of
+matches) and for a common prefix (about 1% of rows match, so ranking
+them all grows with the table while a LIKE scan stops after 50 hits).
+
+Usage:
+    python benchmarks/search_latency.py [--rows 10000 100000 1000000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = [f"{a}{b}{c}" for a in "bcdfgklmnprst" for b in "aeiou" for c in ("ma", "ro", "ki", "ne", "lu", "sa")]
+
+
+def _child(rows: int, repeat: int, path: str) -> None:
+    # Runs in a subprocess: models.py reads TODO_DB_PATH at import.
+    sys.path.insert(0, ROOT)
+    import models
+
+    models.init_db()
+    rng = random.Random(rows)
+    for start in range(0, rows, 10_000):
+        models.import_todos([
+            {"title": " ".join(rng.choice(WORDS) for _ in range(4)),
+             "category": rng.choice(models.CATEGORIES)}
+            for _ in range(start, min(rows, start + 10_000))
+        ])
+    models.import_todos([{"title": f"zyxwv needle {i}", "category": "Family"} for i in range(20)])
+    conn = sqlite3.connect(path)
+
+    def median_ms(fn) -> float:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
+
+    def like(term: str):
+        return conn.execute(
+            "SELECT id, title FROM todos WHERE category = ? AND title LIKE ? "
+            "ORDER BY created_at DESC, id DESC LIMIT 50", ("Family", f"%{term}%"),
+        ).fetchall()
+
+    results = []
+    for term in ("zyxw", WORDS[7][:4]):
+        results.append(median_ms(lambda: models.search_todos(term, "Family", 50)))
+        results.append(median_ms(lambda: like(term)))
+    print(f"{rows:>10}" + "".join(f" {ms:>12.2f}" for ms in results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.rows[0], args.repeat, os.environ["TODO_DB_PATH"])
+        return
+
+    print(f"{'rows':>10} {'rare fts ms':>12} {'rare like ms':>12} {'common fts':>12} {'common like':>12}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, TODO_DB_PATH=os.path.join(tmp, "bench.db"), TODO_METRICS="0")
+            env.pop("DATABASE_URL", None)
+            subprocess.run(
+                [sys.executable, __file__, "--child", "--rows", str(rows), "--repeat", str(args.repeat)],
+                env=env, check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
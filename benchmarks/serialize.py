@@ -0,0 +1,87 @@
+"""CPU time to turn a 10k-row list into a JSON response body.
+
+Compares the old list path (row dicts through ``jsonable_encoder`` and
+FastAPI's JSONResponse) with ``fastjson.encode_rows`` on the cursor
+tuples, using orjson if installed and the stdlib encoder either way.
+Formatting each row into a per-column template is included for
+reference.  Rows are real tuples fetched from a throwaway SQLite file.
+
+Usage:
+    python benchmarks/serialize.py [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import fastjson  # noqa: E402
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    """Median process CPU time of one call, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TODO_DB_PATH"] = os.path.join(tmp, "bench.db")
+        os.environ["TODO_CACHE_TTL"] = "0"
+        import models
+
+        models.init_db()
+        for start in range(0, args.rows, 1000):
+            models.apply_batch([
+                {"op": "create", "title": f"todo {i}", "category": random.choice(models.CATEGORIES)}
+                for i in range(start, min(args.rows, start + 1000))
+            ])
+        rows = models.get_todo_rows()
+        models.close_pool()
+
+    columns = models.ROW_COLUMNS
+    stdlib = json.JSONEncoder(separators=(",", ":"))
+    template = "{" + ",".join(f'"{name}":%s' for name in columns) + "}"
+
+    cases = {
+        "dicts + jsonable_encoder + json (old)":
+            lambda: JSONResponse(jsonable_encoder([dict(zip(columns, row)) for row in rows])).body,
+        "encode_rows, stdlib json":
+            lambda: stdlib.encode([dict(zip(columns, row)) for row in rows]).encode(),
+        "per-row template, stdlib json":
+            lambda: ("[" + ",".join(template % tuple(map(stdlib.encode, row)) for row in rows) + "]").encode(),
+    }
+    if fastjson.orjson is not None:
+        orjson = fastjson.orjson
+        tmpl = b"{" + b",".join(f'"{name}":%b'.encode() for name in columns) + b"}"
+        cases["encode_rows, orjson"] = lambda: fastjson.encode_rows(columns, rows)
+        cases["per-row template, orjson"] = \
+            lambda: b"[" + b",".join(tmpl % tuple(map(orjson.dumps, row)) for row in rows) + b"]"
+
+    print(f"{len(rows)} rows, {len(fastjson.encode_rows(columns, rows))} bytes")
+    print(f"{'path':<40} {'cpu ms':>8}")
+    for label, fn in cases.items():
+        print(f"{label:<40} {cpu_ms(fn, args.repeat):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
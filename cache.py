@@ -0,0 +1,179 @@
+"""Read cache for list queries, invalidated per category.
+
+``ReadCache`` is a size-bounded LRU with a TTL.  Keys are tuples whose
+first element is the category (None for "all categories").  Writers
+announce the categories they changed on an invalidation bus; every
+process's cache subscribes to it.  ``LocalBus`` only reaches the current
+process; ``UnixSocketBus`` also fans out to other workers on the same
+host through datagram sockets in a shared directory.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReadCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 10.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._generations = {}          # category -> write generation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: tuple):
+        """Return (True, value) on a fresh hit, else (False, generation).
+
+        Pass the generation back to put(): if the category was written to
+        in between, the value read from the database may predate the
+        write and is not stored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, self._generation(key[0])
+
+    def put(self, key: tuple, value, generation: tuple) -> None:
+        with self._lock:
+            if self._generation(key[0]) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, category: str) -> None:
+        """Drop entries for ``category`` and for the all-categories lists."""
+        with self._lock:
+            self._generations[category] = self._generations.get(category, 0) + 1
+            self._generations[None] = self._generations.get(None, 0) + 1
+            self.invalidations += 1
+            for key in [k for k in self._entries if k[0] in (category, None)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for category in list(self._generations):
+                self._generations[category] += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _generation(self, category) -> tuple:
+        # The all-categories lists change whenever any category does.
+        if category is None:
+            return (self._generations.get(None, 0),)
+        return (self._generations.get(category, 0), self._generations.get(None, 0))
+
+
+class LocalBus:
+    """Delivers invalidations to subscribers in this process only."""
+
+    def __init__(self) -> None:
+        self._subscribers = []
+
+    def subscribe(self, callback) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, category: str) -> None:
+        self._deliver(category)
+
+    def close(self) -> None:
+        pass
+
+    def _deliver(self, category: str) -> None:
+        for callback in self._subscribers:
+            callback(category)
+
+
+class UnixSocketBus(LocalBus):
+    """Fans invalidations out to every process bound in ``directory``.
+
+    Each process binds ``<directory>/<pid>.sock``; publishing delivers
+    locally and sends one datagram to every other socket there.  Sockets
+    left behind by dead processes are removed when a send is refused.
+    Delivery is best effort: a dropped message is bounded by the TTL.
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._path = os.path.join(directory, f"{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self._path)
+        self._out = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._out.setblocking(False)
+        threading.Thread(target=self._listen, name="cache-bus", daemon=True).start()
+
+    def publish(self, category: str) -> None:
+        self._deliver(category)
+        data = category.encode()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if path == self._path or not name.endswith(".sock"):
+                continue
+            try:
+                self._out.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        self._sock.close()
+        self._out.close()
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                data = self._sock.recv(4096)
+            except OSError:
+                return
+            self._deliver(data.decode())
+
+
+def make_bus(spec: str | None) -> LocalBus:
+    """Build a bus from a TODO_CACHE_BUS value: "" / "local" or "unix:<dir>"."""
+    if not spec or spec == "local":
+        return LocalBus()
+    if spec.startswith("unix:"):
+        return UnixSocketBus(spec[len("unix:"):])
+    raise ValueError(f"unknown cache bus {spec!r}")
@@ -0,0 +1,201 @@
+"""Response compression and in-memory static assets.
+
+``CompressionMiddleware`` compresses responses with brotli (when the
+``brotli`` package is installed) or gzip, whichever the client's
+``Accept-Encoding`` prefers.  Single-body responses smaller than
+``TODO_COMPRESS_MIN_BYTES`` (default 1024) go out as they are: below that
+the headers cost more than the bytes saved.  Streamed responses are
+compressed chunk by chunk, except server-sent events, which must reach
+the client as soon as each event is written.
+
+``load_static`` reads a directory once at startup into ``StaticAsset``
+objects holding the file, its gzip and brotli variants at maximum
+compression, and a content-hashed ETag, so serving one is a dict lookup.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = int(os.environ.get("TODO_COMPRESS_MIN_BYTES", "1024"))
+# Per-response compression runs on the event loop: favour speed.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+_SKIP_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """The best of ENCODINGS that ``accept_encoding`` allows, or None."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _compressor(encoding: str):
+    """An object with ``compress(data)`` and ``flush()`` for ``encoding``."""
+    if encoding == "br":
+        return _Brotli()
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+
+class _Brotli:
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _weak(etag: str) -> str:
+    # A strong ETag promises byte-identical bodies; the encoded body isn't.
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying the negotiated Content-Encoding to responses."""
+
+    def __init__(self, app, min_size: int = MIN_SIZE) -> None:
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), None)
+        encoding = negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or content_type.startswith(_SKIP_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held until we see how large the body is
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                if not more and len(body) < self.min_size:
+                    # Small enough to send as is (304s and HEADs land here).
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _compressor(encoding)
+                data = compressor.compress(body)
+                if not more:
+                    # The whole body in one message: send its exact length.
+                    data += compressor.flush()
+                    await send(_encoded_start(start, encoding, len(data)))
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send(_encoded_start(start, encoding))
+            else:
+                data = compressor.compress(body)
+            if not more:
+                data += compressor.flush()
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _encoded_start(start: dict, encoding: str, length: int | None = None) -> dict:
+    headers = []
+    vary = None
+    for name, value in start.get("headers", []):
+        lower = name.lower()
+        if lower == b"content-length":
+            continue  # replaced below, or left to chunked framing when streamed
+        if lower == b"etag":
+            value = _weak(value.decode("latin-1")).encode("latin-1")
+        if lower == b"vary":
+            vary = value
+            continue
+        headers.append((name, value))
+    if length is not None:
+        headers.append((b"content-length", str(length).encode()))
+    headers.append((b"content-encoding", encoding.encode()))
+    headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    return {**start, "headers": headers}
+
+
+class StaticAsset:
+    """One static file in memory with its precompressed variants."""
+
+    def __init__(self, path: str, cache_control: str) -> None:
+        with open(path, "rb") as f:
+            self.body = f.read()
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/"):
+            self.media_type += "; charset=utf-8"
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+        self.cache_control = cache_control
+        self.variants = {"gzip": gzip.compress(self.body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+        # Only keep variants that are actually smaller.
+        self.variants = {k: v for k, v in self.variants.items() if len(v) < len(self.body)}
+
+    def select(self, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """(body, content-encoding or None) for a request's Accept-Encoding."""
+        encoding = negotiate(accept_encoding)
+        if encoding in self.variants:
+            return self.variants[encoding], encoding
+        return self.body, None
+
+
+def load_static(directory: str, cache_control: dict[str, str]) -> dict[str, StaticAsset]:
+    """Every file directly in ``directory``, keyed by name.
+
+    ``cache_control`` maps a file name to its Cache-Control value; the
+    ``"*"`` entry covers the rest.
+    """
+    assets = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            assets[name] = StaticAsset(path, cache_control.get(name, cache_control["*"]))
+    return assets
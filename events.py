@@ -0,0 +1,89 @@
+"""In-process change feed behind the server-sent events endpoint.
+
+Mutations are published from request threads; subscribers are async
+generators running on the event loop.  Every event gets a sequence
+number, and the last ``backlog`` events are kept so a client that
+reconnects with ``Last-Event-ID`` receives what it missed.
+
+The feed lives in one process: with several uvicorn workers, each worker
+only streams the writes it handled itself.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class ChangeFeed:
+    def __init__(self, backlog: int = 1000) -> None:
+        # Event ids are "<epoch>-<seq>"; a new epoch after a restart tells
+        # resuming clients that the old sequence numbers mean nothing here.
+        self.epoch = str(int(time.time() * 1000))
+        self._seq = 0
+        self._events = deque(maxlen=backlog)
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    @property
+    def last_id(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    def publish(self, op: str, todo: dict) -> int:
+        """Record an insert/update/delete and wake subscribers. Thread-safe."""
+        with self._lock:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "op": op, "todo": todo})
+            waiters = list(self._waiters)
+        for loop, wake in waiters:
+            loop.call_soon_threadsafe(wake.set)
+        return self._seq
+
+    def since(self, seq: int) -> list[dict] | None:
+        """Events after ``seq``, or None if some have already been dropped."""
+        with self._lock:
+            if seq > self._seq:
+                return None
+            if seq < self._seq and (not self._events or self._events[0]["seq"] > seq + 1):
+                return None
+            return [event for event in self._events if event["seq"] > seq]
+
+    def resume_seq(self, last_id: str | None) -> int | None:
+        """Parse a Last-Event-ID; None if it can't be resumed from."""
+        if not last_id:
+            return self._seq
+        epoch, _, seq = last_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    async def subscribe(self, last_id: str | None, heartbeat: float = 15.0):
+        """Yield events after ``last_id`` as they are published.
+
+        Yields ``{"op": "reset"}`` when the client's position cannot be
+        resumed (it should refetch), and None every ``heartbeat`` seconds
+        without events so the caller can keep the connection alive.
+        """
+        wake = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wake)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            seq = self.resume_seq(last_id)
+            while True:
+                wake.clear()
+                events = self.since(seq) if seq is not None else None
+                if events is None:
+                    seq = self._seq
+                    yield {"seq": seq, "op": "reset"}
+                    continue
+                for event in events:
+                    seq = event["seq"]
+                    yield event
+                try:
+                    await asyncio.wait_for(wake.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
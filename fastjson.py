@@ -0,0 +1,39 @@
+"""JSON encoding for list responses, straight from cursor tuples.
+
+FastAPI's default path runs every row dict through ``jsonable_encoder``
+and then the stdlib encoder; for a 10k-row list that is almost all of the
+request's CPU time.  ``encode_rows`` hands the rows to a C encoder in a
+single call instead: orjson when it is installed, else the stdlib
+encoder with compact separators.  The per-row dicts only exist inside
+that call (benchmarks/serialize.py measures this against formatting each
+row into a template, which is slower with either encoder).
+"""
+
+import datetime
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default)
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), default=_default)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode()
+
+
+def encode_rows(columns: tuple, rows: list[tuple]) -> bytes:
+    """A JSON array of objects keyed by ``columns``, one per row tuple."""
+    return dumps([dict(zip(columns, row)) for row in rows])
@@ -1,21 +1,194 @@
 import tkinter as tk
 from tkinter import Canvas
+from collections import Counter, OrderedDict
+import http.client
 import json
+import queue
+import threading
+import time
 import urllib.request
 import urllib.parse
 
+from replica import Replica, default_path
+
 API_BASE = "https://todo-app-qko4.onrender.com/api/todos"
+STATS_URL = API_BASE.rsplit("/todos", 1)[0] + "/stats"
 CATEGORIES = ["Ruofei", "Ruiqi", "Family"]
-
-
-def _api(method, path="", body=None):
-    """Call the remote API. Returns parsed JSON or None."""
-    url = API_BASE + path
-    data = json.dumps(body).encode() if body is not None else None
-    req = urllib.request.Request(url, data=data, method=method)
-    req.add_header("Content-Type", "application/json")
-    with urllib.request.urlopen(req) as resp:
-        return json.loads(resp.read())
+PAGE_SIZE = 50
+
+
+class ApiError(Exception):
+    """The API answered with an error status."""
+
+    def __init__(self, status, body=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.body = body
+
+
+class ApiClient:
+    """One keep-alive HTTP(S) connection to the API host.
+
+    Not thread-safe: it belongs to the I/O worker thread.  A request that
+    finds a reused connection closed (the server may drop it while idle)
+    is retried once on a fresh one.  Nothing else is retried: a timeout
+    may come after the server acted, and a POST must not run twice.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urllib.parse.urlsplit(base_url)
+        self._conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.netloc
+        self._timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Returns (status, headers, parsed JSON body or None)."""
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        while True:
+            reused = self._conn is not None
+            if not reused:
+                self._conn = self._conn_class(self._host, timeout=self._timeout)
+            try:
+                self._conn.request(method, path, body=data, headers=headers)
+                resp = self._conn.getresponse()
+                raw = resp.read()
+            except (http.client.HTTPException, OSError) as exc:
+                self._conn.close()
+                self._conn = None
+                # RemoteDisconnected is a ConnectionResetError.
+                if reused and isinstance(exc, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise
+            return resp.status, resp.headers, json.loads(raw) if raw else None
+
+
+class IOWorker:
+    """Runs blocking API calls on one background thread, in order.
+
+    ``submit(fn, callback, key)`` queues ``fn``; a queued job with the
+    same key is replaced instead, so repeated refreshes collapse into one.
+    ``pump()``, called on the Tk thread from ``root.after``, hands each
+    finished job's ``(result, error)`` to its callback there.
+    """
+
+    def __init__(self):
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self._done = queue.Queue()
+        threading.Thread(target=self._run, name="gui-io", daemon=True).start()
+
+    def submit(self, fn, callback, key=None):
+        with self._cond:
+            self._jobs[key if key is not None else object()] = (fn, callback)
+            self._cond.notify()
+
+    def pump(self):
+        while True:
+            try:
+                callback, result, error = self._done.get_nowait()
+            except queue.Empty:
+                return
+            callback(result, error)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                _, (fn, callback) = self._jobs.popitem(last=False)
+            try:
+                self._done.put((callback, fn(), None))
+            except Exception as exc:
+                self._done.put((callback, None, exc))
+
+
+# The worker thread's connection; only touch it from jobs run by IOWorker.
+_client = ApiClient(API_BASE)
+_API_PATH = urllib.parse.urlsplit(API_BASE).path
+_STATS_PATH = urllib.parse.urlsplit(STATS_URL).path
+
+
+def _api(method, path="", body=None, headers=None):
+    """Call the API on the shared connection. Returns parsed JSON."""
+    status, _, data = _client.request(method, _API_PATH + path, body, headers)
+    if status >= 400:
+        raise ApiError(status, data)
+    return data
+
+
+# url -> (etag, todos, next_cursor) from the last full response
+_page_cache = {}
+
+
+def _fetch_page(category, after=None):
+    """Fetch one page of a category. Returns (todos, next_cursor or None).
+
+    Sends the ETag of the last response for the same page, so an
+    unchanged page costs a bodyless 304.
+    """
+    params = {"category": category, "limit": PAGE_SIZE}
+    if after:
+        params["after"] = after
+    path = _API_PATH + "?" + urllib.parse.urlencode(params)
+    cached = _page_cache.get(path)
+    status, headers, todos = _client.request(
+        "GET", path, headers={"If-None-Match": cached[0]} if cached else None,
+    )
+    if status == 304 and cached:
+        return list(cached[1]), cached[2]
+    if status >= 400:
+        raise ApiError(status)
+    next_cursor = headers.get("X-Next-Cursor")
+    if headers.get("ETag"):
+        _page_cache[path] = (headers["ETag"], todos, next_cursor)
+    return list(todos), next_cursor
+
+
+def _fetch_stats():
+    """(per-category {"total", "completed"} counts, change version they were
+    read at), or ({}, 0) if unavailable."""
+    try:
+        status, headers, stats = _client.request("GET", _STATS_PATH)
+    except (http.client.HTTPException, OSError):
+        return {}, 0
+    if status != 200:
+        return {}, 0
+    tag = (headers.get("ETag") or "").removeprefix("W/").strip('"')
+    return stats, int(tag) if tag.isdigit() else 0
+
+
+def _listen_events(events):
+    """Follow the server's change stream, putting (event, data) on a queue.
+
+    Runs forever on a background thread, reconnecting with Last-Event-ID
+    so the server can replay what was missed.
+    """
+    last_id = None
+    while True:
+        req = urllib.request.Request(API_BASE + "/events")
+        if last_id:
+            req.add_header("Last-Event-ID", last_id)
+        try:
+            # The server sends a keepalive every 15s, so a silent minute
+            # means the connection is dead.
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                event, data = None, ""
+                for raw in resp:
+                    line = raw.decode().rstrip("\r\n")
+                    if line.startswith("id:"):
+                        last_id = line[3:].strip()
+                    elif line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data += line[5:].strip()
+                    elif not line and event:
+                        events.put((event, json.loads(data or "{}")))
+                        event, data = None, ""
+        except OSError:
+            pass
+        time.sleep(3)
 
 # --- Color Palette (warm light) ---
 BG = "#faf8f5"           # warm cream
@@ -35,6 +208,11 @@ TAB_BG = "#faf8f5"
 
 FONT = "Segoe UI"
 
+ROW_HEIGHT = 64     # 56px row plus a 4px gap above and below
+CHECK_SIZE = 22
+MORE_HEIGHT = 40    # the "Load more" row under the last page
+OVERSCAN = 3        # rows laid out past each edge of the viewport
+
 
 class RoundedFrame(Canvas):
     """A canvas that draws a rounded rectangle background."""
@@ -80,9 +258,103 @@ class RoundedFrame(Canvas):
         self._redraw()
 
 
+class TodoRow:
+    """A reusable list row, drawn once and pointed at a todo by show()."""
+
+    def __init__(self, app, canvas):
+        self.todo_id = None
+        self._shown = None
+        self.frame = RoundedFrame(canvas, SURFACE, radius=12, border_color=BORDER, height=ROW_HEIGHT - 8)
+        self.item = canvas.create_window(0, 0, window=self.frame, anchor="nw",
+                                         height=ROW_HEIGHT - 8, state="hidden")
+        row = self.frame.inner
+        row.configure(bg=SURFACE)
+
+        # Checkbox circle
+        self.check = tk.Canvas(
+            row, width=CHECK_SIZE, height=CHECK_SIZE,
+            bg=SURFACE, highlightthickness=0, cursor="hand2",
+        )
+        self.check.place(x=16, rely=0.5, anchor="w")
+        self.check.bind("<Button-1>", lambda e: app.toggle_todo(self.todo_id))
+
+        # Title
+        self.title = tk.Label(row, bg=SURFACE, anchor="w", cursor="hand2")
+        self.title.place(x=50, rely=0.5, anchor="w", relwidth=0.7)
+        self.title.bind("<Button-1>", lambda e: app.toggle_todo(self.todo_id))
+
+        # Delete button, shown on row hover
+        self.delete = tk.Label(
+            row, text="\u2715", font=(FONT, 11), bg=SURFACE,
+            fg=SURFACE, width=3, cursor="hand2",
+        )
+        self.delete.place(relx=1.0, rely=0.5, anchor="e", x=-10)
+        self.delete.bind("<Enter>", lambda e: self.delete.config(fg=DANGER))
+        self.delete.bind("<Leave>", lambda e: self.delete.config(fg=SURFACE))
+        self.delete.bind("<Button-1>", lambda e: app.delete_todo(self.todo_id))
+
+        self.frame.bind("<Enter>", lambda e: self._hover(SURFACE_HOVER, TEXT_DIM))
+        self.frame.bind("<Leave>", lambda e: self._hover(SURFACE, SURFACE))
+
+    def _hover(self, bg, delete_fg):
+        self.frame.set_bg(bg)
+        for child in (self.frame.inner, self.check, self.title, self.delete):
+            child.config(bg=bg)
+        self.delete.config(fg=delete_fg)
+
+    def show(self, todo: dict) -> None:
+        """Point the row at ``todo``, redrawing only what changed."""
+        shown = (todo["id"], todo["title"], bool(todo["completed"]))
+        if shown == self._shown:
+            return
+        if shown[0] != self.todo_id:
+            self._hover(SURFACE, SURFACE)
+        self.todo_id, title, completed = shown
+        self._shown = shown
+
+        self.frame.border_color = SURFACE if completed else BORDER
+        self.frame.set_bg(self.frame.bg_color)
+        self.check.delete("all")
+        if completed:
+            self.check.create_oval(1, 1, CHECK_SIZE - 1, CHECK_SIZE - 1, fill=DONE, outline=DONE)
+            self.check.create_text(
+                CHECK_SIZE // 2, CHECK_SIZE // 2, text="\u2713",
+                font=(FONT, 10, "bold"), fill="#ffffff",
+            )
+        else:
+            self.check.create_oval(1, 1, CHECK_SIZE - 1, CHECK_SIZE - 1, fill="", outline=BORDER, width=2)
+        self.title.config(
+            text=title,
+            fg=TEXT_DIM if completed else TEXT,
+            font=(FONT, 13, "overstrike") if completed else (FONT, 13),
+        )
+
+
 class TodoApp:
     def __init__(self) -> None:
         self.current_category = CATEGORIES[0]
+        self.todos = []
+        self.next_cursor = None
+        self.stats = {}
+        self._stats_versions = {}   # category -> change version self.stats reflects
+        # Only rows in or near the viewport have widgets; scrolling and
+        # updates reuse them instead of building new ones.
+        self._rows = {}     # todo id -> TodoRow on screen
+        self._spare = []    # hidden TodoRows ready for reuse
+        self._events = queue.Queue()
+        # Network calls run on the worker; the Tk thread never blocks on I/O.
+        self._io = IOWorker()
+        self._loading_more = False
+        # Rows shown before the server answered: temp id (< 0) -> title.
+        self._pending_adds = {}
+        self._last_temp_id = 0
+        # Writes in flight per todo id; their echoes are ignored until the last lands.
+        self._inflight = Counter()
+        # With a local replica (the default) the list is read from and
+        # written to disk; the network is only used to sync it.
+        path = default_path()
+        self.replica = Replica(path, API_BASE, on_change=lambda: self._events.put(("synced", {}))) \
+            if path else None
 
         self.root = tk.Tk()
         self.root.title("Todo")
@@ -93,6 +365,12 @@ class TodoApp:
         self._build_ui()
         self.refresh()
 
+        threading.Thread(target=_listen_events, args=(self._events,), daemon=True).start()
+        self.root.after(100, self._drain_events)
+        self.root.after(16, self._pump_io)
+        if self.replica is not None:
+            self.replica.start()
+
     def _build_ui(self) -> None:
         # ── Header ──
         header = tk.Frame(self.root, bg=BG)
@@ -175,17 +453,29 @@ class TodoApp:
         list_outer.pack(fill="both", expand=True, padx=24, pady=(0, 0))
 
         self.canvas = tk.Canvas(list_outer, bg=BG, highlightthickness=0, bd=0)
-        self.scroll_frame = tk.Frame(self.canvas, bg=BG)
-
-        self.scroll_frame.bind("<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self._canvas_window = self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
-        self.canvas.bind("<Configure>", lambda e: self.canvas.itemconfig(self._canvas_window, width=e.width))
-
+        self.canvas.bind("<Configure>", lambda e: self._render())
         self.canvas.pack(fill="both", expand=True)
 
-        self.canvas.bind_all("<MouseWheel>",
-            lambda e: self.canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+        empty_frame = tk.Frame(self.canvas, bg=BG)
+        tk.Label(
+            empty_frame, text="\u2714", font=(FONT, 36),
+            bg=BG, fg=TEXT_DIM,
+        ).pack()
+        tk.Label(
+            empty_frame, text="All clear!", font=(FONT, 14),
+            bg=BG, fg=TEXT_DIM,
+        ).pack(pady=(4, 0))
+        self._empty_item = self.canvas.create_window(0, 60, window=empty_frame, anchor="n", state="hidden")
+
+        more = tk.Label(
+            self.canvas, text="Load more", font=(FONT, 11),
+            bg=BG, fg=TEXT_SEC, pady=10, cursor="hand2",
+        )
+        more.bind("<Button-1>", lambda e: self.load_more())
+        self._more_item = self.canvas.create_window(0, 0, window=more, anchor="nw",
+                                                    height=MORE_HEIGHT, state="hidden")
+
+        self.canvas.bind_all("<MouseWheel>", self._on_wheel)
 
         # ── Status Bar ──
         self.status = tk.Label(
@@ -198,6 +488,9 @@ class TodoApp:
 
     def _update_tabs(self) -> None:
         for cat, btn in self.tab_buttons.items():
+            counts = self.stats.get(cat)
+            remaining = counts["total"] - counts["completed"] if counts else 0
+            btn.config(text=f"{cat}  {remaining}" if remaining else cat)
             if cat == self.current_category:
                 btn.config(bg=TAB_BG, fg=ACCENT)
                 self.tab_indicators[cat].config(bg=ACCENT)
@@ -208,6 +501,7 @@ class TodoApp:
 
     def switch_category(self, category: str) -> None:
         self.current_category = category
+        self.canvas.yview_moveto(0)
         self.refresh()
 
     # ── Placeholder ──
@@ -226,145 +520,337 @@ class TodoApp:
     # ── Refresh ──
 
     def refresh(self) -> None:
-        self._update_tabs()
+        """Reload the counters and the current tab's first page in the background.
 
-        for widget in self.scroll_frame.winfo_children():
-            widget.destroy()
-
-        cat_param = urllib.parse.quote(self.current_category)
-        todos = _api("GET", f"?category={cat_param}")
-
-        if not todos:
-            empty_frame = tk.Frame(self.scroll_frame, bg=BG)
-            empty_frame.pack(fill="x", pady=60)
-            tk.Label(
-                empty_frame, text="\u2714", font=(FONT, 36),
-                bg=BG, fg=TEXT_DIM,
-            ).pack()
-            tk.Label(
-                empty_frame, text="All clear!", font=(FONT, 14),
-                bg=BG, fg=TEXT_DIM,
-            ).pack(pady=(4, 0))
-            self.status.config(text="")
+        Refreshes requested while one is still queued collapse into it.
+        """
+        if self.replica is not None:
+            self._show_local()
             return
-
-        for todo in todos:
-            self._make_row(todo)
-
-        remaining = sum(1 for t in todos if not t["completed"])
-        total = len(todos)
-        self.status.config(text=f"{remaining} remaining  \u2022  {total} total")
-
-        self.scroll_frame.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-
-    # ── Row ──
-
-    def _make_row(self, todo: dict) -> None:
-        completed = bool(todo["completed"])
-
-        row_canvas = RoundedFrame(
-            self.scroll_frame, SURFACE, radius=12,
-            border_color=BORDER if not completed else SURFACE,
-            height=56,
+        self._update_tabs()
+        category = self.current_category
+        self._io.submit(
+            lambda: (_fetch_stats(), _fetch_page(category)),
+            lambda result, error: self._on_refreshed(category, result, error),
+            key="refresh",
         )
-        row_canvas.pack(fill="x", pady=4)
-        row = row_canvas.inner
-        row.configure(bg=SURFACE)
 
-        # Hover effect on the row
-        def on_enter(e):
-            row_canvas.set_bg(SURFACE_HOVER)
-            for child in row.winfo_children():
-                try:
-                    child.config(bg=SURFACE_HOVER)
-                except tk.TclError:
-                    pass
-
-        def on_leave(e):
-            row_canvas.set_bg(SURFACE)
-            for child in row.winfo_children():
-                try:
-                    child.config(bg=SURFACE)
-                except tk.TclError:
-                    pass
-
-        row_canvas.bind("<Enter>", on_enter)
-        row_canvas.bind("<Leave>", on_leave)
+    def _on_refreshed(self, category, result, error) -> None:
+        if error is not None:
+            self.status.config(text="Could not reach the server")
+            return
+        stats, (todos, next_cursor) = result
+        self._set_all_counts(*stats)
+        self._update_tabs()
+        if category != self.current_category:
+            return
+        self.todos, self.next_cursor = todos, next_cursor
+        self._render()
 
-        # Checkbox circle
-        check_size = 22
-        check_canvas = tk.Canvas(
-            row, width=check_size, height=check_size,
-            bg=SURFACE, highlightthickness=0, cursor="hand2",
-        )
-        check_canvas.place(x=16, rely=0.5, anchor="w")
+    def _show_local(self) -> None:
+        self.stats = self.replica.stats()
+        self.todos, self.next_cursor = self.replica.todos(self.current_category), None
+        self._update_tabs()
+        self._render()
+
+    def _refresh_stats(self) -> None:
+        def done(result, error):
+            if error is None and result[0]:
+                self._set_all_counts(*result)
+                self._update_tabs()
+                self._update_status()
+        self._io.submit(_fetch_stats, done, key="stats")
+
+    def _set_all_counts(self, stats: dict, version: int) -> None:
+        """Take /api/stats counts, except categories we hold newer counts for."""
+        for category, counts in stats.items():
+            if version >= self._stats_versions.get(category, 0):
+                self.stats[category] = counts
+                self._stats_versions[category] = version
+
+    def _pump_io(self) -> None:
+        """Run finished I/O callbacks on the Tk thread, about once a frame."""
+        self._io.pump()
+        self.root.after(16, self._pump_io)
+
+    def _update_status(self) -> None:
+        counts = self.stats.get(self.current_category)
+        if not counts or not counts["total"]:
+            self.status.config(text="")
+            return
+        remaining = counts["total"] - counts["completed"]
+        text = f"{remaining} remaining  \u2022  {counts['total']} total"
+        pending = self.replica.pending() if self.replica is not None else 0
+        if pending:
+            text += f"  \u2022  {pending} not synced"
+        self.status.config(text=text)
+
+    def _render(self) -> None:
+        """Lay out the rows in or near the viewport, keyed by todo id.
+
+        A row already on screen keeps its widgets and is only moved (and
+        redrawn if its todo changed); rows that scroll out are hidden and
+        reused for the ones scrolling in.
+        """
+        width = self.canvas.winfo_width()
+        count = len(self.todos)
+        height = count * ROW_HEIGHT + (MORE_HEIGHT if self.next_cursor else 0)
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+        top = int(self.canvas.canvasy(0))
+        first = max(0, top // ROW_HEIGHT - OVERSCAN)
+        last = min(count, (top + self.canvas.winfo_height()) // ROW_HEIGHT + 1 + OVERSCAN)
+        visible = self.todos[first:last]
+
+        wanted = {todo["id"] for todo in visible}
+        for todo_id in [i for i in self._rows if i not in wanted]:
+            row = self._rows.pop(todo_id)
+            self.canvas.itemconfigure(row.item, state="hidden")
+            self._spare.append(row)
+        for index, todo in enumerate(visible, first):
+            row = self._rows.get(todo["id"])
+            if row is None:
+                row = self._spare.pop() if self._spare else TodoRow(self, self.canvas)
+                self._rows[todo["id"]] = row
+            row.show(todo)
+            self.canvas.coords(row.item, 0, index * ROW_HEIGHT + 4)
+            self.canvas.itemconfigure(row.item, width=width, state="normal")
+
+        self.canvas.coords(self._empty_item, width // 2, 60)
+        self.canvas.itemconfigure(self._empty_item, state="hidden" if count else "normal")
+        self.canvas.coords(self._more_item, 0, count * ROW_HEIGHT)
+        self.canvas.itemconfigure(self._more_item, width=width,
+                                  state="normal" if self.next_cursor else "hidden")
+        self._update_status()
+
+    def load_more(self) -> None:
+        """Fetch the next page and append it below the rows already shown."""
+        if not self.next_cursor or self._loading_more:
+            return
+        self._loading_more = True
+        category, cursor = self.current_category, self.next_cursor
+
+        def done(result, error):
+            self._loading_more = False
+            if error is not None or category != self.current_category or cursor != self.next_cursor:
+                return
+            page, self.next_cursor = result
+            self.todos.extend(page)
+            self._render()
+
+        self._io.submit(lambda: _fetch_page(category, cursor), done, key="more")
+
+    def _on_wheel(self, event) -> None:
+        self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        self._render()
+        # Fetch the next page once the user scrolls to the bottom.
+        if self.next_cursor and self.canvas.yview()[1] >= 1.0:
+            self.load_more()
+
+    # ── Change Stream ──
+
+    def _drain_events(self) -> None:
+        """Apply queued change events on the Tk thread."""
+        changed = False
+        need_stats = False
+        try:
+            while True:
+                event, data = self._events.get_nowait()
+                if self.replica is None and event in ("insert", "update", "delete"):
+                    need_stats |= self._counts_from_event(data)
+                changed |= self._apply_event(event, data)
+        except queue.Empty:
+            pass
+        if need_stats:
+            # One counter fetch per batch of events, whichever tab they hit.
+            self._refresh_stats()
+        if changed:
+            self._render()
+        self.root.after(100, self._drain_events)
+
+    def _apply_event(self, event: str, todo: dict) -> bool:
+        """Patch self.todos; returns True if the visible list changed."""
+        if self.replica is not None:
+            # The replica applies server changes; a change event only
+            # means it is worth pulling now.
+            if event == "synced":
+                self._show_local()
+            else:
+                self.replica.sync_soon()
+            return False
+        if event == "reset":
+            self.refresh()
+            return False
+        if event == "insert":
+            if todo["category"] != self.current_category \
+                    or any(t["id"] == todo["id"] for t in self.todos):
+                return False
+            for temp_id, title in self._pending_adds.items():
+                if title == todo["title"]:
+                    # Our own add echoed back before the POST answered.
+                    del self._pending_adds[temp_id]
+                    self._replace_todo(temp_id, todo)
+                    return True
+            self.todos.insert(0, todo)
+            return True
+        if self._inflight[todo["id"]]:
+            return False
+        if event == "update":
+            for i, t in enumerate(self.todos):
+                if t["id"] == todo["id"]:
+                    self.todos[i] = todo
+                    return True
+            return False
+        if event == "delete":
+            remaining = [t for t in self.todos if t["id"] != todo["id"]]
+            changed = len(remaining) != len(self.todos)
+            self.todos = remaining
+            return changed
+        return False
 
-        if completed:
-            check_canvas.create_oval(1, 1, check_size - 1, check_size - 1, fill=DONE, outline=DONE)
-            check_canvas.create_text(
-                check_size // 2, check_size // 2, text="\u2713",
-                font=(FONT, 10, "bold"), fill="#ffffff",
-            )
-        else:
-            check_canvas.create_oval(1, 1, check_size - 1, check_size - 1, fill="", outline=BORDER, width=2)
+    # ── Actions ──
 
-        check_canvas.bind("<Button-1>", lambda e, tid=todo["id"]: self.toggle_todo(tid))
+    # Each action updates the list and counters at once, then sends the
+    # request; the server's answer replaces the guess, a failure resyncs.
 
-        # Title
-        title_text = todo["title"]
-        title_fg = TEXT_DIM if completed else TEXT
-        title_font = (FONT, 13, "overstrike") if completed else (FONT, 13)
-        title = tk.Label(
-            row, text=title_text, font=title_font, bg=SURFACE,
-            fg=title_fg, anchor="w", cursor="hand2",
-        )
-        title.place(x=50, rely=0.5, anchor="w", relwidth=0.7)
-        title.bind("<Button-1>", lambda e, tid=todo["id"]: self.toggle_todo(tid))
+    def _find(self, todo_id: int):
+        return next((t for t in self.todos if t["id"] == todo_id), None)
 
-        # Delete button
-        delete = tk.Label(
-            row, text="\u2715", font=(FONT, 11), bg=SURFACE,
-            fg=SURFACE, width=3, cursor="hand2",
-        )
-        delete.place(relx=1.0, rely=0.5, anchor="e", x=-10)
-        delete.bind("<Enter>", lambda e: delete.config(fg=DANGER))
-        delete.bind("<Leave>", lambda e: delete.config(fg=SURFACE))
-        delete.bind("<Button-1>", lambda e, tid=todo["id"]: self.delete_todo(tid))
+    def _replace_todo(self, todo_id: int, todo: dict) -> None:
+        self.todos = [
+            t for t in self.todos if t["id"] != todo["id"] or todo["id"] == todo_id
+        ]
+        self.todos = [todo if t["id"] == todo_id else t for t in self.todos]
+
+    def _adjust_stats(self, category: str, total: int = 0, completed: int = 0) -> None:
+        counts = self.stats.setdefault(category, {"total": 0, "completed": 0})
+        counts["total"] += total
+        counts["completed"] += completed
+        self._update_tabs()
 
-        # Show delete on row hover
-        def row_enter(e, d=delete):
-            on_enter(e)
-            d.config(fg=TEXT_DIM)
+    def _apply_counts(self, category: str, reply: dict) -> bool:
+        """Take the category's counters from a write reply (or change event),
+        unless ours are as new, or more of our own writes are still in
+        flight and already counted in the guess.  True if taken."""
+        if self._pending_adds or self._inflight:
+            return False
+        if reply["version"] < self._stats_versions.get(category, 0):
+            return False
+        self.stats[category] = reply["stats"]
+        self._stats_versions[category] = reply["version"]
+        self._update_tabs()
+        return True
 
-        def row_leave(e, d=delete):
-            on_leave(e)
-            d.config(fg=SURFACE)
+    def _counts_from_event(self, todo: dict) -> bool:
+        """Apply an event's counters; True if /api/stats is needed to catch up.
 
-        row_canvas.bind("<Enter>", row_enter)
-        row_canvas.bind("<Leave>", row_leave)
+        The echo of our own write is no newer than its reply, so it costs
+        nothing; only news we could not apply from the event is fetched.
+        """
+        counts = todo.pop("stats", None)
+        if counts is not None and self._apply_counts(
+                todo["category"], {"stats": counts, "version": todo["version"]}):
+            return False
+        return todo["version"] > self._stats_versions.get(todo["category"], 0)
 
-    # ── Actions ──
+    def _on_write_failed(self, error) -> None:
+        self.refresh()
+        self.status.config(text=f"Could not save change ({error})")
 
     def add_todo(self) -> None:
         title = self.entry.get().strip()
         if not title or title == "What needs to be done?":
             return
-        _api("POST", "", {"title": title, "category": self.current_category})
+        category = self.current_category
         self.entry.delete(0, "end")
-        self.refresh()
         self.entry.focus_set()
+        if self.replica is not None:
+            self.replica.add(title, category)
+            self._show_local()
+            return
+        self._last_temp_id -= 1
+        temp_id = self._last_temp_id
+        self._pending_adds[temp_id] = title
+        self.todos.insert(0, {"id": temp_id, "title": title, "completed": False,
+                              "category": category, "created_at": None})
+        self._adjust_stats(category, total=1)
+        self._render()
+
+        def done(reply, error):
+            if self._pending_adds.pop(temp_id, None) is None:
+                return  # the change stream already swapped in the real row
+            if error is not None:
+                self.todos = [t for t in self.todos if t["id"] != temp_id]
+                self._on_write_failed(error)
+                return
+            self._replace_todo(temp_id, reply["todo"])
+            self._apply_counts(category, reply)
+            self._render()
+
+        self._io.submit(lambda: _api("POST", "", {"title": title, "category": category}), done)
 
     def toggle_todo(self, todo_id: int) -> None:
-        _api("PUT", f"/{todo_id}", {})
-        self.refresh()
+        if self.replica is not None:
+            self.replica.toggle(todo_id)
+            self._show_local()
+            return
+        todo = self._find(todo_id)
+        if todo is None or todo_id < 0:
+            return  # not saved yet
+        completed = not todo["completed"]
+        # Conditional on the version we showed, unless an earlier click on
+        # this row is still in flight and has already moved it on.
+        headers = None if self._inflight[todo_id] else {"If-Match": f'"{todo.get("version")}"'}
+        self._replace_todo(todo_id, dict(todo, completed=completed))
+        self._adjust_stats(todo["category"], completed=1 if completed else -1)
+        self._render()
+        self._inflight[todo_id] += 1
+
+        def done(reply, error):
+            self._inflight[todo_id] -= 1
+            if not self._inflight[todo_id]:
+                del self._inflight[todo_id]
+            if isinstance(error, ApiError) and error.status == 409 and error.body:
+                # Someone else changed it first: show their row, not ours.
+                self._replace_todo(todo_id, error.body["todo"])
+                self._render()
+                self._refresh_stats()
+                self.status.config(text="Todo was changed elsewhere")
+            elif error is not None:
+                self._on_write_failed(error)
+            elif todo_id not in self._inflight and self._find(todo_id) is not None:
+                self._replace_todo(todo_id, reply["todo"])
+                self._apply_counts(todo["category"], reply)
+                self._render()
+
+        self._io.submit(
+            lambda: _api("PUT", f"/{todo_id}", {"completed": completed}, headers), done,
+        )
 
     def delete_todo(self, todo_id: int) -> None:
-        _api("DELETE", f"/{todo_id}")
-        self.refresh()
+        if self.replica is not None:
+            self.replica.delete(todo_id)
+            self._show_local()
+            return
+        todo = self._find(todo_id)
+        if todo is None or todo_id < 0:
+            return
+        self.todos = [t for t in self.todos if t["id"] != todo_id]
+        self._adjust_stats(todo["category"], total=-1, completed=-1 if todo["completed"] else 0)
+        self._render()
+
+        def done(reply, error):
+            if error is None:
+                self._apply_counts(todo["category"], reply)
+            elif not (isinstance(error, ApiError) and error.status == 404):
+                self._on_write_failed(error)
+
+        self._io.submit(lambda: _api("DELETE", f"/{todo_id}"), done)
 
     def run(self) -> None:
         self.root.mainloop()
+        if self.replica is not None:
+            self.replica.close()
 
 
 if __name__ == "__main__":
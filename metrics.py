@@ -0,0 +1,226 @@
+"""Request/query metrics, slow-query log and a sampling profiler.
+
+Histograms are kept in-process and rendered in the Prometheus text format
+by ``render()`` for ``GET /metrics``.  Configured from the environment at
+import time:
+
+    TODO_METRICS=0          don't record histograms or install the hooks
+    TODO_SLOW_QUERY_MS=<n>  log data-layer calls slower than n milliseconds
+    TODO_PROFILER=1         enable GET /debug/profile
+
+With metrics off and no slow-query threshold the hooks are not installed
+at all, so the request and query paths run exactly as they would without
+this module.
+"""
+
+import bisect
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+ENABLED = os.environ.get("TODO_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ["TODO_SLOW_QUERY_MS"]) if os.environ.get("TODO_SLOW_QUERY_MS") else None
+PROFILER = os.environ.get("TODO_PROFILER") == "1"
+
+log = logging.getLogger("todo.slow_query")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_registry = []
+_NULL = nullcontext()
+
+
+class Histogram:
+    """A labelled histogram with fixed upper bounds, safe to share between threads."""
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}   # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *labels):
+        """Context manager observing the block's duration in seconds."""
+        return _Timer(self, labels) if ENABLED else _NULL
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            base = [f'{k}="{v}"' for k, v in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(base, bound)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(base, '+Inf')} {values[-1]}")
+            suffix = _labels(base) if base else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def _labels(base: list[str], le=None) -> str:
+    parts = base if le is None else base + [f'le="{le}"']
+    return "{" + ",".join(parts) + "}"
+
+
+HTTP_SECONDS = Histogram(
+    "todo_http_request_duration_seconds", "Time from request start to the last response byte.",
+    ("method", "route", "status"),
+)
+HTTP_BYTES = Histogram(
+    "todo_http_response_bytes", "Response body size.", ("route",), BYTES_BUCKETS,
+)
+SERIALIZE_SECONDS = Histogram(
+    "todo_http_serialize_seconds", "Time spent rendering JSON response bodies.",
+)
+DB_QUERY_SECONDS = Histogram(
+    "todo_db_query_seconds", "Data-layer calls, including connection checkout.", ("query",),
+)
+DB_ACQUIRE_SECONDS = Histogram(
+    "todo_db_acquire_seconds", "Time spent waiting for a pooled connection.",
+)
+DB_DECODE_SECONDS = Histogram(
+    "todo_db_decode_seconds", "Time spent turning fetched rows into dicts.", ("query",),
+)
+DB_WRITE_BATCH = Histogram(
+    "todo_db_write_batch_size", "Writes committed together by the SQLite group-commit writer.",
+    (), (1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+def timed_query(fn):
+    """Record a data-layer function in DB_QUERY_SECONDS and the slow-query log."""
+    if not ENABLED and SLOW_QUERY_MS is None:
+        return fn
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if ENABLED:
+                DB_QUERY_SECONDS.observe(elapsed, name)
+            if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+                log.warning("slow query %s%r took %.1f ms", name, args, elapsed * 1000)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and body size per route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; using its
+            # template keeps /api/todos/{todo_id} to one series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - start, scope["method"], route, str(status))
+            HTTP_BYTES.observe(size, route)
+
+
+def render(gauges: dict | None = None, counters: dict | None = None) -> str:
+    """All histograms plus ``gauges`` and ``counters`` ({name: (help, value)},
+    counter names ending in ``_total``) as Prometheus text."""
+    lines = []
+    for name, (help, value) in (gauges or {}).items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {float(value)}"]
+    for name, (help, value) in (counters or {}).items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {float(value)}"]
+    for histogram in _registry:
+        lines += histogram.render()
+    return "\n".join(lines) + "\n"
+
+
+# --- Sampling profiler ---
+
+_profile_lock = threading.Lock()
+
+
+def profile(seconds: float, interval: float = 0.005) -> str:
+    """Sample every thread's stack for ``seconds``; returns collapsed stacks.
+
+    The output has one ``frame;frame;... count`` line per distinct stack,
+    root first, as consumed by flamegraph.pl and speedscope.  Raises
+    RuntimeError if another profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,548 @@
+"""Versioned schema migrations for the SQLite and PostgreSQL backends.
+
+Each migration has a version, a description and a list of steps per
+dialect.  A step is either an SQL string or a callable taking a cursor
+(for changes that need to inspect the schema first).  Applied versions are
+recorded in ``schema_migrations``; ``migrate()`` applies whatever is
+missing, in order, one transaction per migration.
+"""
+
+SQLITE = "sqlite"
+POSTGRES = "postgres"
+
+# Arbitrary key for pg_advisory_lock so concurrent workers migrate one at a time.
+_PG_LOCK_ID = 7_236_001
+
+
+def _sqlite_add_category(cur) -> None:
+    # Databases created before categories existed lack the column.
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(todos)").fetchall()]
+    if "category" not in columns:
+        cur.execute("ALTER TABLE todos ADD COLUMN category TEXT NOT NULL DEFAULT 'Family'")
+
+
+MIGRATIONS = [
+    (1, "create todos table", {
+        SQLITE: [
+            """
+            CREATE TABLE IF NOT EXISTS todos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                completed BOOLEAN DEFAULT 0,
+                category TEXT NOT NULL DEFAULT 'Family',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+        POSTGRES: [
+            """
+            CREATE TABLE IF NOT EXISTS todos (
+                id SERIAL PRIMARY KEY,
+                title TEXT NOT NULL,
+                completed BOOLEAN DEFAULT FALSE,
+                category TEXT NOT NULL DEFAULT 'Family',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+    }),
+    (2, "add todos.category", {
+        SQLITE: [_sqlite_add_category],
+        POSTGRES: [
+            "ALTER TABLE todos ADD COLUMN IF NOT EXISTS category TEXT NOT NULL DEFAULT 'Family'",
+        ],
+    }),
+    (3, "index todos by category, newest first", {
+        SQLITE: [
+            "CREATE INDEX IF NOT EXISTS idx_todos_category_created ON todos (category, created_at DESC)",
+        ],
+        POSTGRES: [
+            "CREATE INDEX IF NOT EXISTS idx_todos_category_created ON todos (category, created_at DESC)",
+        ],
+    }),
+    (4, "index todos by category and completion", {
+        SQLITE: [
+            "CREATE INDEX IF NOT EXISTS idx_todos_category_completed ON todos (category, completed)",
+        ],
+        POSTGRES: [
+            "CREATE INDEX IF NOT EXISTS idx_todos_category_completed ON todos (category, completed)",
+        ],
+    }),
+    (5, "add id tiebreaker to list indexes for keyset pagination", {
+        SQLITE: [
+            "DROP INDEX IF EXISTS idx_todos_category_created",
+            "CREATE INDEX idx_todos_category_created ON todos (category, created_at DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_todos_created ON todos (created_at DESC, id DESC)",
+        ],
+        POSTGRES: [
+            "DROP INDEX IF EXISTS idx_todos_category_created",
+            "CREATE INDEX idx_todos_category_created ON todos (category, created_at DESC, id DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_todos_created ON todos (created_at DESC, id DESC)",
+        ],
+    }),
+    # Every write takes the next value of sync_state.version and stamps it
+    # on the row (or on a tombstone for deletes), so clients can ask for
+    # everything that changed after the version they last saw.
+    (6, "track row versions and deletions for delta sync", {
+        SQLITE: [
+            "ALTER TABLE todos ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+            # SQLite can't add a column with a CURRENT_TIMESTAMP default.
+            "ALTER TABLE todos ADD COLUMN updated_at TIMESTAMP",
+            "UPDATE todos SET version = id, updated_at = created_at",
+            """
+            CREATE TABLE sync_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+            """,
+            "INSERT INTO sync_state (id, version) SELECT 1, COALESCE(MAX(id), 0) FROM todos",
+            """
+            CREATE TABLE todo_tombstones (
+                id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX idx_todos_version ON todos (version)",
+            "CREATE INDEX idx_todo_tombstones_version ON todo_tombstones (version)",
+        ],
+        POSTGRES: [
+            "ALTER TABLE todos ADD COLUMN version BIGINT NOT NULL DEFAULT 0",
+            "ALTER TABLE todos ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+            "UPDATE todos SET version = id, updated_at = created_at",
+            """
+            CREATE TABLE sync_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL
+            )
+            """,
+            "INSERT INTO sync_state (id, version) SELECT 1, COALESCE(MAX(id), 0) FROM todos",
+            """
+            CREATE TABLE todo_tombstones (
+                id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                version BIGINT NOT NULL,
+                deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX idx_todos_version ON todos (version)",
+            "CREATE INDEX idx_todo_tombstones_version ON todo_tombstones (version)",
+        ],
+    }),
+    # category_state.version is the newest change version in each category,
+    # kept current by triggers so a list request can be validated with a
+    # single primary-key lookup.
+    (7, "per-category version counter", {
+        SQLITE: [
+            """
+            CREATE TABLE category_state (
+                category TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            INSERT INTO category_state (category, version)
+            SELECT category, MAX(version) FROM (
+                SELECT category, version FROM todos
+                UNION ALL SELECT category, version FROM todo_tombstones
+            ) GROUP BY category
+            """,
+            """
+            CREATE TRIGGER todos_category_version_ins AFTER INSERT ON todos BEGIN
+                INSERT OR IGNORE INTO category_state (category) VALUES (NEW.category);
+                UPDATE category_state SET version = NEW.version
+                WHERE category = NEW.category AND version < NEW.version;
+            END
+            """,
+            """
+            CREATE TRIGGER todos_category_version_upd AFTER UPDATE OF version ON todos BEGIN
+                INSERT OR IGNORE INTO category_state (category) VALUES (NEW.category);
+                UPDATE category_state SET version = NEW.version
+                WHERE category = NEW.category AND version < NEW.version;
+            END
+            """,
+            """
+            CREATE TRIGGER todo_tombstones_category_version AFTER INSERT ON todo_tombstones BEGIN
+                INSERT OR IGNORE INTO category_state (category) VALUES (NEW.category);
+                UPDATE category_state SET version = NEW.version
+                WHERE category = NEW.category AND version < NEW.version;
+            END
+            """,
+        ],
+        POSTGRES: [
+            """
+            CREATE TABLE category_state (
+                category TEXT PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            INSERT INTO category_state (category, version)
+            SELECT category, MAX(version) FROM (
+                SELECT category, version FROM todos
+                UNION ALL SELECT category, version FROM todo_tombstones
+            ) AS changes GROUP BY category
+            """,
+            """
+            CREATE OR REPLACE FUNCTION bump_category_version() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO category_state (category, version) VALUES (NEW.category, NEW.version)
+                ON CONFLICT (category)
+                DO UPDATE SET version = GREATEST(category_state.version, EXCLUDED.version);
+                RETURN NULL;
+            END
+            $$
+            """,
+            """
+            CREATE TRIGGER todos_category_version
+            AFTER INSERT OR UPDATE OF version ON todos
+            FOR EACH ROW EXECUTE FUNCTION bump_category_version()
+            """,
+            """
+            CREATE TRIGGER todo_tombstones_category_version
+            AFTER INSERT OR UPDATE ON todo_tombstones
+            FOR EACH ROW EXECUTE FUNCTION bump_category_version()
+            """,
+        ],
+    }),
+    # Full-text search over titles.  SQLite indexes them in an external-
+    # content FTS5 table (the text lives only in todos) with prefix indexes
+    # for 2- and 3-character prefixes; Postgres in a generated tsvector
+    # column.  Both use plain word splitting without stemming.
+    (8, "title search index", {
+        SQLITE: [
+            """
+            CREATE VIRTUAL TABLE todos_fts USING fts5(
+                title, content='todos', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+            """,
+            "INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')",
+            """
+            CREATE TRIGGER todos_fts_ins AFTER INSERT ON todos BEGIN
+                INSERT INTO todos_fts (rowid, title) VALUES (NEW.id, NEW.title);
+            END
+            """,
+            """
+            CREATE TRIGGER todos_fts_del AFTER DELETE ON todos BEGIN
+                INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+            END
+            """,
+            """
+            CREATE TRIGGER todos_fts_upd AFTER UPDATE OF title ON todos BEGIN
+                INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+                INSERT INTO todos_fts (rowid, title) VALUES (NEW.id, NEW.title);
+            END
+            """,
+        ],
+        POSTGRES: [
+            "ALTER TABLE todos ADD COLUMN search tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', title)) STORED",
+            "CREATE INDEX idx_todos_search ON todos USING GIN (search)",
+        ],
+    }),
+    # Per-category total/completed counters next to the version, kept by
+    # triggers so counts are a primary-key lookup instead of a COUNT(*).
+    # On SQLite the migration 7 triggers are also rebuilt to create the
+    # category row with INSERT ... WHERE NOT EXISTS: a trigger's OR IGNORE
+    # is overridden by the firing statement's conflict clause, so the
+    # tombstones' INSERT OR REPLACE would replace (and zero) the row.
+    (9, "per-category counters", {
+        SQLITE: [
+            "ALTER TABLE category_state ADD COLUMN total INTEGER NOT NULL DEFAULT 0",
+            "ALTER TABLE category_state ADD COLUMN completed INTEGER NOT NULL DEFAULT 0",
+            """
+            UPDATE category_state SET
+                total = (SELECT COUNT(*) FROM todos WHERE todos.category = category_state.category),
+                completed = (SELECT COUNT(*) FROM todos
+                             WHERE todos.category = category_state.category AND completed)
+            """,
+            "DROP TRIGGER todos_category_version_ins",
+            "DROP TRIGGER todos_category_version_upd",
+            "DROP TRIGGER todo_tombstones_category_version",
+            """
+            CREATE TRIGGER todos_category_version_ins AFTER INSERT ON todos BEGIN
+                INSERT INTO category_state (category) SELECT NEW.category
+                WHERE NOT EXISTS (SELECT 1 FROM category_state WHERE category = NEW.category);
+                UPDATE category_state SET version = MAX(version, NEW.version),
+                    total = total + 1, completed = completed + (COALESCE(NEW.completed, 0) != 0)
+                WHERE category = NEW.category;
+            END
+            """,
+            """
+            CREATE TRIGGER todos_category_version_upd AFTER UPDATE OF version ON todos BEGIN
+                INSERT INTO category_state (category) SELECT NEW.category
+                WHERE NOT EXISTS (SELECT 1 FROM category_state WHERE category = NEW.category);
+                UPDATE category_state SET version = NEW.version
+                WHERE category = NEW.category AND version < NEW.version;
+            END
+            """,
+            """
+            CREATE TRIGGER todos_counts_upd AFTER UPDATE OF completed, category ON todos BEGIN
+                UPDATE category_state SET total = total - 1,
+                    completed = completed - (COALESCE(OLD.completed, 0) != 0)
+                WHERE category = OLD.category;
+                INSERT INTO category_state (category) SELECT NEW.category
+                WHERE NOT EXISTS (SELECT 1 FROM category_state WHERE category = NEW.category);
+                UPDATE category_state SET total = total + 1,
+                    completed = completed + (COALESCE(NEW.completed, 0) != 0)
+                WHERE category = NEW.category;
+            END
+            """,
+            """
+            CREATE TRIGGER todos_counts_del AFTER DELETE ON todos BEGIN
+                UPDATE category_state SET total = total - 1,
+                    completed = completed - (COALESCE(OLD.completed, 0) != 0)
+                WHERE category = OLD.category;
+            END
+            """,
+            """
+            CREATE TRIGGER todo_tombstones_category_version AFTER INSERT ON todo_tombstones BEGIN
+                INSERT INTO category_state (category) SELECT NEW.category
+                WHERE NOT EXISTS (SELECT 1 FROM category_state WHERE category = NEW.category);
+                UPDATE category_state SET version = NEW.version
+                WHERE category = NEW.category AND version < NEW.version;
+            END
+            """,
+        ],
+        POSTGRES: [
+            "ALTER TABLE category_state ADD COLUMN total BIGINT NOT NULL DEFAULT 0",
+            "ALTER TABLE category_state ADD COLUMN completed BIGINT NOT NULL DEFAULT 0",
+            """
+            UPDATE category_state SET total = c.total, completed = c.completed
+            FROM (SELECT category, COUNT(*) AS total, COUNT(*) FILTER (WHERE completed) AS completed
+                  FROM todos GROUP BY category) AS c
+            WHERE category_state.category = c.category
+            """,
+            """
+            CREATE OR REPLACE FUNCTION count_category_todos() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE category_state SET total = total - 1,
+                        completed = completed - COALESCE(OLD.completed, FALSE)::int
+                    WHERE category = OLD.category;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO category_state (category, total, completed)
+                    VALUES (NEW.category, 1, COALESCE(NEW.completed, FALSE)::int)
+                    ON CONFLICT (category) DO UPDATE SET
+                        total = category_state.total + 1,
+                        completed = category_state.completed + EXCLUDED.completed;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """,
+            """
+            CREATE TRIGGER todos_category_counts
+            AFTER INSERT OR DELETE OR UPDATE OF completed, category ON todos
+            FOR EACH ROW EXECUTE FUNCTION count_category_todos()
+            """,
+        ],
+    }),
+    # completed_at is kept by triggers so every write path (toggle, batch,
+    # import) stamps it.  Todos completed long enough ago are moved to
+    # todos_archive by models.archive_completed(); on PostgreSQL the archive
+    # is range-partitioned by month of completion, partitions being created
+    # by the archiver as it needs them.  Rows already completed are stamped
+    # with the migration time: updated_at is only created_at for rows older
+    # than migration 6, so it says nothing about when they were completed,
+    # and an old stamp would archive them at the next startup.
+    (10, "completed_at and todos_archive", {
+        SQLITE: [
+            "ALTER TABLE todos ADD COLUMN completed_at TIMESTAMP",
+            "UPDATE todos SET completed_at = CURRENT_TIMESTAMP WHERE completed",
+            """
+            CREATE TRIGGER todos_completed_at_ins AFTER INSERT ON todos
+            WHEN NEW.completed AND NEW.completed_at IS NULL BEGIN
+                UPDATE todos SET completed_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+            END
+            """,
+            """
+            CREATE TRIGGER todos_completed_at_upd AFTER UPDATE OF completed ON todos
+            WHEN NEW.completed IS NOT OLD.completed BEGIN
+                UPDATE todos SET completed_at = CASE WHEN NEW.completed THEN CURRENT_TIMESTAMP END
+                WHERE id = NEW.id;
+            END
+            """,
+            "CREATE INDEX idx_todos_completed_at ON todos (completed_at) WHERE completed",
+            """
+            CREATE TABLE todos_archive (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                completed BOOLEAN NOT NULL DEFAULT 1,
+                category TEXT NOT NULL,
+                created_at TIMESTAMP,
+                version INTEGER NOT NULL,
+                updated_at TIMESTAMP,
+                completed_at TIMESTAMP NOT NULL,
+                archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX idx_todos_archive_category_created ON todos_archive (category, created_at DESC, id DESC)",
+        ],
+        POSTGRES: [
+            "ALTER TABLE todos ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP",
+            "UPDATE todos SET completed_at = CURRENT_TIMESTAMP WHERE completed",
+            """
+            CREATE OR REPLACE FUNCTION stamp_completed_at() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF NOT COALESCE(NEW.completed, FALSE) THEN
+                    NEW.completed_at := NULL;
+                ELSIF TG_OP = 'INSERT' OR NOT COALESCE(OLD.completed, FALSE) THEN
+                    NEW.completed_at := COALESCE(NEW.completed_at, CURRENT_TIMESTAMP);
+                END IF;
+                RETURN NEW;
+            END
+            $$
+            """,
+            """
+            CREATE TRIGGER todos_completed_at
+            BEFORE INSERT OR UPDATE OF completed ON todos
+            FOR EACH ROW EXECUTE FUNCTION stamp_completed_at()
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_todos_completed_at ON todos (completed_at) WHERE completed",
+            """
+            CREATE TABLE todos_archive (
+                id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                completed BOOLEAN NOT NULL DEFAULT TRUE,
+                category TEXT NOT NULL,
+                created_at TIMESTAMP,
+                version BIGINT NOT NULL,
+                updated_at TIMESTAMP,
+                completed_at TIMESTAMP NOT NULL,
+                archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, completed_at)
+            ) PARTITION BY RANGE (completed_at)
+            """,
+            # Catches anything outside the monthly partitions, so a move never fails.
+            "CREATE TABLE todos_archive_default PARTITION OF todos_archive DEFAULT",
+            "CREATE INDEX idx_todos_archive_category_created ON todos_archive (category, created_at DESC, id DESC)",
+        ],
+    }),
+    # A todo moving to another category (an import can do that) changes the
+    # old category's list too, so its version has to move as well.
+    (11, "bump the old category's version on a category change", {
+        SQLITE: [
+            """
+            CREATE TRIGGER todos_category_version_move AFTER UPDATE OF category ON todos
+            WHEN NEW.category IS NOT OLD.category BEGIN
+                UPDATE category_state SET version = MAX(version, NEW.version)
+                WHERE category = OLD.category;
+            END
+            """,
+        ],
+        POSTGRES: [
+            """
+            CREATE OR REPLACE FUNCTION bump_old_category_version() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                UPDATE category_state SET version = GREATEST(version, NEW.version)
+                WHERE category = OLD.category;
+                RETURN NULL;
+            END
+            $$
+            """,
+            """
+            CREATE TRIGGER todos_category_version_move
+            AFTER UPDATE OF category ON todos
+            FOR EACH ROW WHEN (NEW.category IS DISTINCT FROM OLD.category)
+            EXECUTE FUNCTION bump_old_category_version()
+            """,
+        ],
+    }),
+    # A batch create may carry a client key, so a retried request whose
+    # first attempt did land (but answered too late) doesn't add it twice.
+    (12, "remember batch create keys", {
+        SQLITE: [
+            """
+            CREATE TABLE todo_create_keys (
+                key TEXT PRIMARY KEY,
+                todo_id INTEGER,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX idx_todo_create_keys_created ON todo_create_keys (created_at)",
+        ],
+        POSTGRES: [
+            """
+            CREATE TABLE todo_create_keys (
+                key TEXT PRIMARY KEY,
+                todo_id INTEGER,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "CREATE INDEX idx_todo_create_keys_created ON todo_create_keys (created_at)",
+        ],
+    }),
+]
+
+
+def current_version(conn, dialect: str) -> int:
+    cur = conn.cursor()
+    _create_version_table(cur, dialect)
+    cur.execute("SELECT MAX(version) FROM schema_migrations")
+    return cur.fetchone()[0] or 0
+
+
+def migrate(conn, dialect: str, target: int | None = None) -> list[int]:
+    """Apply pending migrations up to ``target`` (default: latest).
+
+    ``conn`` must not be inside a transaction: for SQLite, a plain
+    connection; for PostgreSQL, one in autocommit mode.  Returns the
+    versions that were applied.
+    """
+    param = "%s" if dialect == POSTGRES else "?"
+    begin = "BEGIN" if dialect == POSTGRES else "BEGIN IMMEDIATE"
+    cur = conn.cursor()
+    _create_version_table(cur, dialect)
+    if dialect == POSTGRES:
+        cur.execute("SELECT pg_advisory_lock(%s)", (_PG_LOCK_ID,))
+
+    applied = []
+    try:
+        for version, description, steps in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            cur.execute(begin)
+            try:
+                # Checked inside the transaction so a concurrent worker that
+                # got there first is not repeated.
+                cur.execute(f"SELECT 1 FROM schema_migrations WHERE version = {param}", (version,))
+                if cur.fetchone() is None:
+                    for step in steps[dialect]:
+                        if callable(step):
+                            step(cur)
+                        else:
+                            cur.execute(step)
+                    cur.execute(
+                        f"INSERT INTO schema_migrations (version, description) VALUES ({param}, {param})",
+                        (version, description),
+                    )
+                    applied.append(version)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+    finally:
+        if dialect == POSTGRES:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_PG_LOCK_ID,))
+        cur.close()
+    return applied
+
+
+def _create_version_table(cur, dialect: str) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
@@ -1,24 +1,344 @@
+import csv
+import datetime
+import functools
+import io
+import itertools
+import json
 import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import metrics
+import migrations
+from cache import ReadCache, make_bus
+from pool import ConnectionPool
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
 CATEGORIES = ["Ruofei", "Ruiqi", "Family"]
 
+POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+CACHE_SIZE = int(os.environ.get("TODO_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.environ.get("TODO_CACHE_TTL", "10"))
+
+_COLUMNS = "id, title, completed, category, created_at, version, updated_at"
+# Field order of the tuples returned by get_todo_rows().
+ROW_COLUMNS = tuple(name.strip() for name in _COLUMNS.split(","))
+
+# --- Connection pool (shared by both backends) ---
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect, minsize=POOL_MIN, maxsize=POOL_MAX,
+                    timeout=POOL_TIMEOUT, check=_check_conn,
+                    on_acquire=metrics.DB_ACQUIRE_SECONDS.observe if metrics.ENABLED else None,
+                    discard_on=_DRIVER_ERRORS,
+                )
+    return _pool
+
+
+def close_pool(timeout: float = 10.0) -> None:
+    """Drain and close the pool; called on server shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close(timeout)
+
+
+# SQLite's group-commit writer, started on the first write (see _write()).
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def pool_stats() -> dict | None:
+    return _pool.stats() if _pool is not None else None
+
+
+# --- Read cache for get_todo_rows(), invalidated by the mutators ---
+
+_cache = ReadCache(CACHE_SIZE, CACHE_TTL)
+# "unix:<dir>" keeps several uvicorn workers on one host coherent.
+_cache_bus = make_bus(os.environ.get("TODO_CACHE_BUS"))
+_cache_bus.subscribe(_cache.invalidate)
+
+
+def _cached(fn):
+    """Serve get_todo_rows() from the cache; results must be treated as read-only.
+
+    Entries are keyed by the category's change version, read before the
+    rows (callers that already read it pass ``version``).  A write the bus
+    never announced (another worker on LocalBus, the CLI, or the gap
+    between a commit and _invalidates) moves the version on, so the old
+    entry is simply never looked up again.
+    """
+    @functools.wraps(fn)
+    def wrapper(category=None, limit=None, after=None, before=None, include_archived=False,
+                version=None):
+        if not _cache.enabled:
+            return fn(category, limit, after, before, include_archived)
+        if version is None:
+            version = get_version(category)
+        key = (category, version, limit, after, before, include_archived)
+        hit, value = _cache.get(key)
+        if hit:
+            return value
+        result = fn(category, limit, after, before, include_archived)
+        _cache.put(key, result, value)
+        return result
+    return wrapper
+
+
+def _invalidates(fn):
+    """Invalidate the categories of the rows a mutator returns, after commit."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        result = fn(*args, **kwargs)
+        written = result[0] if isinstance(result, tuple) else result   # see _stateful()
+        rows = written if isinstance(written, list) else [written]
+        for category in {row["category"] for row in rows if row}:
+            _cache_bus.publish(category)
+        return result
+    return wrapper
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+def shutdown() -> None:
+    """Release process-wide resources; called when the server stops."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+    close_pool()
+    _cache_bus.close()
+
+
+# --- Conditional writes (shared) ---
+
+class VersionConflict(Exception):
+    """A write conditioned on a row version found the row at another version."""
+
+    def __init__(self, current: dict):
+        super().__init__(f"todo {current['id']} is at version {current['version']}")
+        self.current = current
+
+
+# --- Keyset pagination (shared query builder) ---
+
+def _list_query(param: str, category: str | None, limit: int | None,
+                after: tuple | None, before: tuple | None,
+                include_archived: bool = False) -> tuple[str, list]:
+    """Build the list query, newest first, keyed on (created_at, id).
+
+    ``after`` pages towards older rows and ``before`` towards newer ones;
+    both are the (created_at, id) of a row on the current page.  A
+    ``before`` query is ordered oldest first so LIMIT keeps the rows
+    nearest the cursor; get_todo_rows() reverses it back.
+    ``include_archived`` adds todos_archive, filtered the same way.
+    """
+    where, params = [], []
+    if category:
+        where.append(f"category = {param}")
+        params.append(category)
+    if after is not None:
+        where.append(f"(created_at, id) < ({param}, {param})")
+        params.extend(after)
+    if before is not None:
+        where.append(f"(created_at, id) > ({param}, {param})")
+        params.extend(before)
+    where_sql = " WHERE " + " AND ".join(where) if where else ""
+    sql = f"SELECT {_COLUMNS} FROM todos{where_sql}"
+    if include_archived:
+        sql += f" UNION ALL SELECT {_COLUMNS} FROM todos_archive{where_sql}"
+        params = params + params
+    sql += " ORDER BY created_at ASC, id ASC" if before is not None else " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += f" LIMIT {param}"
+        params.append(limit)
+    return sql, params
+
+
+def get_todos(category: str | None = None, limit: int | None = None,
+              after: tuple | None = None, before: tuple | None = None,
+              include_archived: bool = False) -> list[dict]:
+    """get_todo_rows() as dicts keyed by column name."""
+    rows = get_todo_rows(category, limit, after, before, include_archived)
+    with metrics.DB_DECODE_SECONDS.time("get_todos"):
+        return [dict(zip(ROW_COLUMNS, row)) for row in rows]
+
+
+# --- Per-category counters (shared shaping) ---
+
+def _stats(version: int, rows) -> dict:
+    """{"version", "categories": {name: {"total", "completed"}}} from category_state rows."""
+    categories = {category: {"total": 0, "completed": 0} for category in CATEGORIES}
+    for category, total, completed in rows:
+        if total or category in categories:
+            categories[category] = {"total": total, "completed": completed}
+    return {"version": version, "categories": categories}
+
+
+def _category_state(row) -> dict:
+    """{"version", "total", "completed"} from a category_state row, or zeros."""
+    version, total, completed = row if row else (0, 0, 0)
+    return {"version": version, "total": total, "completed": completed}
+
+
+def _stateful(fn, with_state: bool, category: str | None = None):
+    """``fn`` (a per-row helper taking the connection or cursor first), or,
+    with ``with_state``, a wrapper returning ``(result, state)``.
+
+    The state is _category_state() for ``category`` (default: the written
+    row's), read in the same transaction, so it is exactly the write's
+    effect; it is None when nothing was written.  On PostgreSQL the caller
+    must run it inside _transaction(): pooled connections autocommit.
+    """
+    if not with_state:
+        return fn
+
+    def run(handle, *args):
+        result = fn(handle, *args)
+        name = category or (result["category"] if result else None)
+        return result, _read_category_state(handle, name) if name else None
+    return run
+
+
+# --- Title search (shared helpers) ---
+
+def _search_terms(query: str) -> list[str]:
+    """Words of a search query; each matches as a prefix, all must match."""
+    return re.findall(r"\w+", query.lower())
+
+
+# --- Bulk export/import (shared helpers) ---
+
+EXPORT_BATCH = 1000
+_IMPORT_COLUMNS = ("id", "title", "completed", "category", "created_at")
+
+
+def _sqlite_timestamp(value: str | None) -> str | None:
+    """ISO 8601 from any source, as SQLite's own 'YYYY-MM-DD HH:MM:SS' in UTC.
+
+    created_at is compared as text, so rows exported from Postgres
+    ('T' separator, offsets) must use the same layout to sort right.
+    """
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat(sep=" ")
+
+
+def _rejects_as_value_error(fn):
+    """Re-raise driver errors from an import chunk as ValueError, so they
+    read as bad input (a 400); the chunk has rolled back."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except _DRIVER_ERRORS as exc:
+            raise ValueError(f"rejected by the database: {exc}") from exc
+    return wrapper
+
+
+def _dedupe_ids(rows: list[dict]) -> list[dict]:
+    """Keep the last row for each explicit id; an upsert can't hit one row twice."""
+    last = {row["id"]: i for i, row in enumerate(rows) if row.get("id") is not None}
+    return [row for i, row in enumerate(rows) if row.get("id") is None or last[row["id"]] == i]
+
+
+def _invalidate_categories(categories) -> None:
+    for category in set(categories):
+        _cache_bus.publish(category)
+
+
+# --- Archival (shared settings) ---
+
+# Rows moved per archive_completed() call; each call is one short transaction.
+ARCHIVE_BATCH = 500
+
+
+# --- Batch operations (shared dispatch) ---
+
+# How long a batch create's key is remembered; a client retrying later
+# than this creates the todo again.
+CREATE_KEY_DAYS = 7
+
+
+def _apply_op(handle, op: dict) -> dict | None:
+    """Apply one batch op with the backend's per-row helpers.
+
+    ``op["op"]`` is create (title, category, optional key), update (id,
+    title and/or completed), toggle (id) or delete (id).  Returns the
+    written or deleted row, or None if the todo does not exist.  A create
+    repeating an earlier create's key returns that todo instead (None if
+    it has since been deleted).
+    """
+    kind = op["op"]
+    if kind == "create":
+        if op.get("key"):
+            return _add_once(handle, op["title"], op.get("category", "Family"), op["key"])
+        return _add(handle, op["title"], op.get("category", "Family"))
+    if kind == "update":
+        return _update(handle, op["id"], op.get("title"), op.get("completed"))
+    if kind == "toggle":
+        return _toggle(handle, op["id"])
+    if kind == "delete":
+        return _delete(handle, op["id"])
+    raise ValueError(f"unknown op {kind!r}")
+
+
 # --- Database abstraction: PostgreSQL (cloud) or SQLite (local) ---
 
 if DATABASE_URL:
     import psycopg2
     import psycopg2.extras
 
-    def _get_conn():
+    # Errors that may leave a connection broken; anything else (say a
+    # VersionConflict) is rolled back and the connection reused.
+    _DRIVER_ERRORS = psycopg2.Error
+
+    def _connect():
         conn = psycopg2.connect(DATABASE_URL)
         conn.autocommit = True
         return conn
 
+    def _check_conn(conn) -> bool:
+        if conn.closed:
+            return False
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
+
+    def _get_conn():
+        return _get_pool().connection()
+
     def _fetchall(cursor) -> list[dict]:
-        cols = [desc[0] for desc in cursor.description]
-        return [dict(zip(cols, row)) for row in cursor.fetchall()]
+        rows = cursor.fetchall()
+        with metrics.DB_DECODE_SECONDS.time("fetchall"):
+            cols = [desc[0] for desc in cursor.description]
+            return [dict(zip(cols, row)) for row in rows]
 
     def _fetchone(cursor) -> dict | None:
         cols = [desc[0] for desc in cursor.description]
@@ -26,157 +346,900 @@ if DATABASE_URL:
         return dict(zip(cols, row)) if row else None
 
     def init_db() -> None:
-        conn = _get_conn()
-        cur = conn.cursor()
+        with _get_conn() as conn:
+            migrations.migrate(conn, migrations.POSTGRES)
+
+    @_cached
+    @metrics.timed_query
+    def get_todo_rows(category: str | None = None, limit: int | None = None,
+                      after: tuple | None = None, before: tuple | None = None,
+                      include_archived: bool = False) -> list[tuple]:
+        """List rows newest first as tuples in ROW_COLUMNS order; see _list_query()."""
+        sql, params = _list_query("%s", category, limit, after, before, include_archived)
+        with _get_conn() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        if before is not None:
+            rows.reverse()
+        return rows
+
+    @contextmanager
+    def _transaction():
+        """A cursor whose statements commit (or roll back) together."""
+        with _get_conn() as conn:
+            conn.autocommit = False
+            try:
+                with conn, conn.cursor() as cur:
+                    yield cur
+            finally:
+                conn.autocommit = True
+
+    # Each write takes the next version through a row lock on sync_state,
+    # held until commit, so versions become visible in order and
+    # get_changes() can never skip past a slower concurrent write.
+    _BUMP = "WITH v AS (UPDATE sync_state SET version = version + 1 RETURNING version AS next_version) "
+
+    def _delete_sql(where: str) -> str:
+        """DELETE matching rows, leaving tombstones; selects the deleted rows."""
+        return (
+            _BUMP + f", d AS (DELETE FROM todos WHERE {where} RETURNING {_COLUMNS}), "
+            "t AS (INSERT INTO todo_tombstones (id, category, version) "
+            "SELECT d.id, d.category, next_version FROM d, v "
+            "ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, deleted_at = CURRENT_TIMESTAMP) "
+            "SELECT d.id, d.title, d.completed, d.category, d.created_at, "
+            "next_version AS version, d.updated_at FROM d, v"
+        )
+
+    def _add(cur, title: str, category: str) -> dict:
         cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS todos (
-                id SERIAL PRIMARY KEY,
-                title TEXT NOT NULL,
-                completed BOOLEAN DEFAULT FALSE,
-                category TEXT NOT NULL DEFAULT 'Family',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
+            _BUMP + "INSERT INTO todos (title, category, version) "
+            f"SELECT %s, %s, next_version FROM v RETURNING {_COLUMNS}",
+            (title, category),
         )
-        conn.close()
+        return _fetchone(cur)
 
-    def get_todos(category: str | None = None) -> list[dict]:
-        conn = _get_conn()
-        cur = conn.cursor()
-        if category:
-            cur.execute(
-                "SELECT id, title, completed, category, created_at FROM todos "
-                "WHERE category = %s ORDER BY created_at DESC", (category,)
-            )
-        else:
+    def _add_once(cur, title: str, category: str, key: str) -> dict | None:
+        """_add() unless ``key`` was used before; then the todo that created, if it still exists."""
+        # A concurrent insert of the same key waits here until that one commits.
+        cur.execute("INSERT INTO todo_create_keys (key) VALUES (%s) ON CONFLICT (key) DO NOTHING", (key,))
+        if cur.rowcount == 0:
             cur.execute(
-                "SELECT id, title, completed, category, created_at FROM todos "
-                "ORDER BY created_at DESC"
+                f"SELECT {_COLUMNS} FROM todos WHERE id = (SELECT todo_id FROM todo_create_keys WHERE key = %s)",
+                (key,),
             )
-        result = _fetchall(cur)
-        conn.close()
-        return result
+            return _fetchone(cur)
+        row = _add(cur, title, category)
+        cur.execute("UPDATE todo_create_keys SET todo_id = %s WHERE key = %s", (row["id"], key))
+        cur.execute(
+            "DELETE FROM todo_create_keys WHERE created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'",
+            (CREATE_KEY_DAYS,),
+        )
+        return row
+
+    def _add_many(cur, items: list[dict]) -> list[dict]:
+        """Insert several todos with one statement, versions in input order."""
+        n = len(items)
+        rows = psycopg2.extras.execute_values(
+            cur,
+            f"WITH v AS (UPDATE sync_state SET version = version + {n} RETURNING version AS last_version) "
+            "INSERT INTO todos (title, category, version) "
+            f"SELECT d.title, d.category, last_version - {n} + d.ord "
+            f"FROM (VALUES %s) AS d (title, category, ord), v RETURNING {_COLUMNS}",
+            [(item["title"], item.get("category", "Family"), k) for k, item in enumerate(items, 1)],
+            page_size=n, fetch=True,
+        )
+        cols = [desc[0] for desc in cur.description]
+        return sorted((dict(zip(cols, row)) for row in rows), key=lambda row: row["version"])
 
-    def add_todo(title: str, category: str = "Family") -> dict:
-        conn = _get_conn()
-        cur = conn.cursor()
+    def _conflict(cur, todo_id: int) -> None:
+        """After a versioned write matched nothing: raise VersionConflict if the todo exists."""
+        cur.execute(f"SELECT {_COLUMNS} FROM todos WHERE id = %s", (todo_id,))
+        current = _fetchone(cur)
+        if current is not None:
+            raise VersionConflict(current)
+
+    def _toggle(cur, todo_id: int, expected_version: int | None = None) -> dict | None:
         cur.execute(
-            "INSERT INTO todos (title, category) VALUES (%s, %s) RETURNING id, title, completed, category, created_at",
-            (title, category),
+            _BUMP + "UPDATE todos SET completed = NOT completed, version = next_version, "
+            "updated_at = CURRENT_TIMESTAMP FROM v "
+            f"WHERE id = %s AND (%s::bigint IS NULL OR version = %s) RETURNING {_COLUMNS}",
+            (todo_id, expected_version, expected_version),
         )
-        result = _fetchone(cur)
-        conn.close()
-        return result
+        row = _fetchone(cur)
+        if row is None and expected_version is not None:
+            _conflict(cur, todo_id)
+        return row
 
-    def toggle_todo(todo_id: int) -> dict | None:
-        conn = _get_conn()
-        cur = conn.cursor()
+    def _update(cur, todo_id: int, title: str | None = None, completed: bool | None = None,
+                expected_version: int | None = None) -> dict | None:
         cur.execute(
-            "UPDATE todos SET completed = NOT completed WHERE id = %s "
-            "RETURNING id, title, completed, category, created_at",
-            (todo_id,),
+            _BUMP + "UPDATE todos SET title = COALESCE(%s, title), "
+            "completed = COALESCE(%s, completed), version = next_version, "
+            "updated_at = CURRENT_TIMESTAMP FROM v "
+            f"WHERE id = %s AND (%s::bigint IS NULL OR version = %s) RETURNING {_COLUMNS}",
+            (title, completed, todo_id, expected_version, expected_version),
         )
-        result = _fetchone(cur)
-        conn.close()
-        return result
+        row = _fetchone(cur)
+        if row is None and expected_version is not None:
+            _conflict(cur, todo_id)
+        return row
+
+    def _delete(cur, todo_id: int) -> dict | None:
+        cur.execute(_delete_sql("id = %s"), (todo_id,))
+        return _fetchone(cur)
+
+    def _delete_many(cur, todo_ids: list[int]) -> list[dict | None]:
+        cur.execute(_delete_sql("id = ANY(%s)"), (todo_ids,))
+        deleted = {row["id"]: row for row in _fetchall(cur)}
+        # A repeated id was already deleted by its first occurrence.
+        return [deleted.pop(todo_id, None) for todo_id in todo_ids]
+
+    def _clear_completed(cur, category: str) -> list[dict]:
+        cur.execute(_delete_sql("category = %s AND completed"), (category,))
+        return _fetchall(cur)
+
+    @_invalidates
+    @metrics.timed_query
+    def add_todo(title: str, category: str = "Family", with_state: bool = False) -> dict:
+        """Insert a todo; with ``with_state``, returns (row, category state), see _stateful()."""
+        with _transaction() as cur:
+            return _stateful(_add, with_state)(cur, title, category)
+
+    @_invalidates
+    @metrics.timed_query
+    def toggle_todo(todo_id: int, expected_version: int | None = None,
+                    with_state: bool = False) -> dict | None:
+        """Flip completed; with ``expected_version``, only from that version (else VersionConflict)."""
+        with _transaction() as cur:
+            return _stateful(_toggle, with_state)(cur, todo_id, expected_version)
+
+    @_invalidates
+    @metrics.timed_query
+    def update_todo(todo_id: int, title: str | None = None, completed: bool | None = None,
+                    expected_version: int | None = None, with_state: bool = False) -> dict | None:
+        """Set the fields given; with ``expected_version``, only from that version (else VersionConflict)."""
+        with _transaction() as cur:
+            return _stateful(_update, with_state)(cur, todo_id, title, completed, expected_version)
+
+    @_invalidates
+    @metrics.timed_query
+    def delete_todo(todo_id: int, with_state: bool = False) -> dict | None:
+        """Delete a todo, leaving a tombstone; returns the deleted row."""
+        with _transaction() as cur:
+            return _stateful(_delete, with_state)(cur, todo_id)
+
+    @_invalidates
+    @metrics.timed_query
+    def apply_batch(ops: list[dict]) -> list[dict | None]:
+        """Apply a list of ops in one transaction; see _apply_op().
+
+        Runs of consecutive creates without a key go through a single
+        execute_values INSERT and runs of deletes through a single
+        DELETE ... ANY().
+        """
+        results = []
+        with _transaction() as cur:
+            for (kind, keyed), run in itertools.groupby(ops, key=lambda op: (op["op"], bool(op.get("key")))):
+                run = list(run)
+                if kind == "create" and not keyed:
+                    results.extend(_add_many(cur, run))
+                elif kind == "delete":
+                    results.extend(_delete_many(cur, [op["id"] for op in run]))
+                else:
+                    results.extend(_apply_op(cur, op) for op in run)
+        return results
+
+    @_invalidates
+    @metrics.timed_query
+    def clear_completed(category: str, with_state: bool = False) -> list[dict]:
+        """Delete every completed todo in a category; returns the deleted rows."""
+        with _transaction() as cur:
+            return _stateful(_clear_completed, with_state, category)(cur, category)
 
-    def update_todo(todo_id: int, title: str) -> dict | None:
-        conn = _get_conn()
-        cur = conn.cursor()
+    def _archive_partitions(cur, cutoff: datetime.datetime) -> None:
+        """Create the monthly archive partitions for rows completed before ``cutoff``.
+
+        Covers every month from the oldest due row to the cutoff, so no
+        row due now can fall into the default partition (which would then
+        block creating its month's partition).
+        """
+        cur.execute("SELECT MIN(completed_at) FROM todos WHERE completed AND completed_at < %s", (cutoff,))
+        oldest = cur.fetchone()[0]
+        if oldest is None:
+            return
+        month = oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        while month <= cutoff:
+            following = (month + datetime.timedelta(days=32)).replace(day=1)
+            name = f"todos_archive_{month:%Y_%m}"
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0] is None:
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF todos_archive "
+                    "FOR VALUES FROM (%s) TO (%s)", (month, following),
+                )
+            month = following
+
+    @_invalidates
+    @metrics.timed_query
+    def archive_completed(older_than_days: float, batch: int = ARCHIVE_BATCH) -> list[dict]:
+        """Move up to ``batch`` todos completed over ``older_than_days`` ago to todos_archive.
+
+        The rows leave todos (with tombstones, so synced clients drop them)
+        and land in the archive in one statement; rows locked by a
+        concurrent write are skipped until the next call.  Returns the
+        moved rows; fewer than ``batch`` means nothing else is due.
+        """
+        with _get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT CURRENT_TIMESTAMP::timestamp - %s * INTERVAL '1 day'", (older_than_days,))
+            cutoff = cur.fetchone()[0]
+            _archive_partitions(cur, cutoff)
+            cur.execute(
+                _BUMP + ", d AS (DELETE FROM todos WHERE id IN ("
+                "SELECT id FROM todos WHERE completed AND completed_at < %s "
+                "ORDER BY completed_at LIMIT %s FOR UPDATE SKIP LOCKED) "
+                f"RETURNING {_COLUMNS}, completed_at), "
+                "a AS (INSERT INTO todos_archive "
+                "(id, title, completed, category, created_at, version, updated_at, completed_at) "
+                "SELECT id, title, TRUE, category, created_at, version, updated_at, completed_at FROM d "
+                "ON CONFLICT DO NOTHING), "
+                "t AS (INSERT INTO todo_tombstones (id, category, version) "
+                "SELECT d.id, d.category, next_version FROM d, v "
+                "ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, deleted_at = CURRENT_TIMESTAMP) "
+                "SELECT d.id, d.title, d.completed, d.category, d.created_at, "
+                "next_version AS version, d.updated_at FROM d, v",
+                (cutoff, batch),
+            )
+            return _fetchall(cur)
+
+    @metrics.timed_query
+    def get_changes(since: int, category: str | None = None) -> dict:
+        """Rows written and ids deleted after version ``since``.
+
+        The returned ``version`` is read first, so passing it back as
+        ``since`` next time never misses a write (it may repeat a few).
+        """
+        cat = " AND category = %s" if category else ""
+        params = (since, category) if category else (since,)
+        with _get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT version FROM sync_state")
+            version = cur.fetchone()[0]
+            cur.execute(f"SELECT {_COLUMNS} FROM todos WHERE version > %s{cat} ORDER BY version", params)
+            todos = _fetchall(cur)
+            cur.execute(
+                f"SELECT id, category, version FROM todo_tombstones WHERE version > %s{cat} ORDER BY version",
+                params,
+            )
+            deleted = _fetchall(cur)
+        return {"version": version, "todos": todos, "deleted": deleted}
+
+    @metrics.timed_query
+    def get_version(category: str | None = None) -> int:
+        """Newest change version in a category (or overall); cheap to poll."""
+        with _get_conn() as conn, conn.cursor() as cur:
+            if category:
+                cur.execute("SELECT version FROM category_state WHERE category = %s", (category,))
+            else:
+                cur.execute("SELECT version FROM sync_state")
+            row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _read_category_state(cur, category: str) -> dict:
         cur.execute(
-            "UPDATE todos SET title = %s WHERE id = %s "
-            "RETURNING id, title, completed, category, created_at",
-            (title, todo_id),
+            "SELECT version, total, completed FROM category_state WHERE category = %s", (category,),
         )
-        result = _fetchone(cur)
-        conn.close()
-        return result
+        return _category_state(cur.fetchone())
+
+    @metrics.timed_query
+    def search_todos(query: str, category: str | None = None,
+                     limit: int = 50, offset: int = 0) -> list[tuple]:
+        """Rows whose title has every word of ``query`` as a prefix, best first.
+
+        Row tuples are in ROW_COLUMNS order.  Matching uses the GIN index
+        on todos.search; ranking is ts_rank, ties newest first.
+        """
+        terms = _search_terms(query)
+        if not terms:
+            return []
+        cat = " AND category = %s" if category else ""
+        params = [" & ".join(f"{term}:*" for term in terms)]
+        if category:
+            params.append(category)
+        with _get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {_COLUMNS} FROM todos, to_tsquery('simple', %s) AS query "
+                f"WHERE search @@ query{cat} "
+                "ORDER BY ts_rank(search, query) DESC, id DESC LIMIT %s OFFSET %s",
+                params + [limit, offset],
+            )
+            return cur.fetchall()
+
+    @metrics.timed_query
+    def get_stats() -> dict:
+        """Total and completed counts per category, from the trigger-kept counters."""
+        with _get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT version FROM sync_state")
+            version = cur.fetchone()[0]
+            cur.execute("SELECT category, total, completed FROM category_state")
+            return _stats(version, cur.fetchall())
 
-    def delete_todo(todo_id: int) -> bool:
-        conn = _get_conn()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM todos WHERE id = %s", (todo_id,))
-        deleted = cur.rowcount > 0
-        conn.close()
-        return deleted
+    def export_todos(category: str | None = None, batch: int = EXPORT_BATCH):
+        """Yield lists of row tuples (ROW_COLUMNS order), oldest id first.
+
+        Reads through a server-side cursor, so memory stays at one batch
+        however large the table is.  Holds a pooled connection until the
+        generator is exhausted or closed.
+        """
+        where = "WHERE category = %s " if category else ""
+        with _get_conn() as conn:
+            conn.autocommit = False
+            try:
+                with conn, conn.cursor(name="todo_export") as cur:
+                    cur.itersize = batch
+                    cur.execute(f"SELECT {_COLUMNS} FROM todos {where}ORDER BY id", (category,) if category else ())
+                    while rows := cur.fetchmany(batch):
+                        yield rows
+            finally:
+                conn.autocommit = True
+
+    @_rejects_as_value_error
+    @metrics.timed_query
+    def import_todos(rows: list[dict]) -> int:
+        """Upsert one chunk of rows in a single transaction; returns the count.
+
+        Rows are dicts with title and optional id, completed, category and
+        created_at.  The chunk is COPYed into a temporary staging table and
+        merged with one INSERT ... ON CONFLICT: a row with an existing id
+        replaces it, a row without one gets a new id.  Every row gets a
+        fresh change version and any tombstone for its id is dropped.
+        """
+        rows = _dedupe_ids(rows)
+        if not rows:
+            return 0
+        n = len(rows)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow([
+                "" if row.get("id") is None else row["id"], row["title"],
+                bool(row.get("completed", False)), row.get("category", "Family"),
+                row.get("created_at") or "",
+            ])
+        buf.seek(0)
+        with _transaction() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS todo_import ("
+                "ord SERIAL, id INTEGER, title TEXT, completed BOOLEAN, category TEXT, created_at TIMESTAMP"
+                ") ON COMMIT DELETE ROWS"
+            )
+            cur.execute("SELECT setval(pg_get_serial_sequence('todo_import', 'ord'), 1, false)")
+            cur.copy_expert(
+                "COPY todo_import (id, title, completed, category, created_at) FROM STDIN WITH (FORMAT csv)", buf
+            )
+            # Rows replaced under another category leave that list too.
+            cur.execute("SELECT DISTINCT t.category FROM todos t JOIN todo_import s ON s.id = t.id")
+            moved_from = [r[0] for r in cur.fetchall()]
+            cur.execute(
+                f"WITH v AS (UPDATE sync_state SET version = version + {n} RETURNING version AS last_version) "
+                "INSERT INTO todos (id, title, completed, category, created_at, version, updated_at) "
+                "SELECT COALESCE(s.id, nextval('todos_id_seq')), s.title, s.completed, "
+                f"s.category, COALESCE(s.created_at, CURRENT_TIMESTAMP), last_version - {n} + s.ord, "
+                "CURRENT_TIMESTAMP FROM todo_import s, v ORDER BY s.ord "
+                "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title, completed = EXCLUDED.completed, "
+                "category = EXCLUDED.category, created_at = EXCLUDED.created_at, "
+                "version = EXCLUDED.version, updated_at = EXCLUDED.updated_at"
+            )
+            cur.execute("DELETE FROM todo_tombstones WHERE id IN (SELECT id FROM todo_import)")
+            # Explicit ids don't advance the sequence; move it past them.
+            cur.execute(
+                "SELECT setval('todos_id_seq', MAX(id)) FROM todos "
+                "HAVING MAX(id) > (SELECT last_value FROM todos_id_seq)"
+            )
+        _invalidate_categories([row.get("category", "Family") for row in rows] + moved_from)
+        return n
 
 else:
     # --- SQLite fallback for local development ---
 
-    DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "todos.db")
+    DB_PATH = os.environ.get("TODO_DB_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "todos.db"
+    )
+
+    # Applied once per connection; connections are long-lived and pooled.
+    _PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    # RETURNING needs SQLite 3.35+; older builds fall back to a re-select.
+    _HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+    _DRIVER_ERRORS = sqlite3.Error
 
-    def _get_conn() -> sqlite3.Connection:
-        conn = sqlite3.connect(DB_PATH)
+    def _connect() -> sqlite3.Connection:
+        # Pooled connections move between request threads, but only one
+        # thread uses a connection at a time.
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
         conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA journal_mode=WAL")
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
         return conn
 
+    def _check_conn(conn: sqlite3.Connection) -> bool:
+        conn.execute("SELECT 1")
+        return True
+
+    @contextmanager
+    def _get_conn():
+        """Check out a pooled connection and run the block in a transaction."""
+        with _get_pool().connection() as conn:
+            with conn:
+                yield conn
+
+    def _write_returning(conn, sql: str, params: tuple, todo_id: int | None = None) -> dict | None:
+        """Run an INSERT/UPDATE on todos and return the affected row."""
+        if _HAS_RETURNING:
+            rows = conn.execute(f"{sql} RETURNING {_COLUMNS}", params).fetchall()
+        else:
+            cursor = conn.execute(sql, params)
+            if todo_id is None:
+                todo_id = cursor.lastrowid
+            elif cursor.rowcount == 0:
+                return None
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM todos WHERE id = ?", (todo_id,)
+            ).fetchall()
+        return dict(rows[0]) if rows else None
+
+    def _next_version(conn, count: int = 1) -> int:
+        """Take the next ``count`` change versions and return the last.
+
+        The write lock taken here orders them with the commit.
+        """
+        if _HAS_RETURNING:
+            return conn.execute(
+                "UPDATE sync_state SET version = version + ? RETURNING version", (count,)
+            ).fetchall()[0][0]
+        conn.execute("UPDATE sync_state SET version = version + ?", (count,))
+        return conn.execute("SELECT version FROM sync_state").fetchone()[0]
+
+    # Writes queued within this many ms share one transaction; 0 gives
+    # every write its own transaction on a pooled connection.
+    GROUP_COMMIT_MS = float(os.environ.get("TODO_GROUP_COMMIT_MS", "1"))
+    GROUP_COMMIT_MAX = int(os.environ.get("TODO_GROUP_COMMIT_MAX", "256"))
+
+    class _WriteQueue:
+        """A single writer thread that commits queued writes together.
+
+        submit() hands the writer a function taking the connection and
+        returns a Future.  The writer takes the oldest write plus whatever
+        queued up behind it while the last transaction committed, and runs
+        them in one IMMEDIATE transaction, each under a savepoint so a
+        failing write is undone alone.  Futures resolve after the commit.
+
+        A lone write never waits: if the writer is idle it commits on the
+        caller's thread, and an empty queue commits at once.  Only when
+        the previous batch held more writes than have arrived so far does
+        the writer linger, up to ``window`` seconds, for the writers that
+        are evidently about to resubmit.
+        """
+
+        def __init__(self, window: float, max_batch: int):
+            self._window = window
+            self._max_batch = max_batch
+            self._jobs = queue.Queue()
+            self._busy = threading.Lock()   # held while a transaction is open
+            self._conn = _connect()
+            self._conn.isolation_level = None   # transactions are explicit here
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+
+        def submit(self, fn, *args) -> Future:
+            future = Future()
+            if self._jobs.empty() and self._busy.acquire(blocking=False):
+                # Nothing to group with: skip the hand-off to the writer thread.
+                try:
+                    self._commit([(future, fn, args)])
+                finally:
+                    self._busy.release()
+                return future
+            self._jobs.put((future, fn, args))
+            return future
+
+        def close(self) -> None:
+            """Commit what is queued, then stop."""
+            self._jobs.put(None)
+            self._thread.join()
+            self._conn.close()
+
+        def _run(self) -> None:
+            last = 1
+            while (job := self._jobs.get()) is not None:
+                with self._busy:
+                    batch = [job]
+                    self._gather(batch, self._max_batch, None)
+                    if len(batch) < last:
+                        self._gather(batch, min(last, self._max_batch), time.monotonic() + self._window)
+                    last = len(batch)
+                    self._commit(batch)
+
+        def _gather(self, batch: list, size: int, deadline: float | None) -> None:
+            """Add queued jobs to ``batch`` up to ``size``; wait until ``deadline`` if set."""
+            while len(batch) < size:
+                try:
+                    if deadline is None:
+                        job = self._jobs.get_nowait()
+                    else:
+                        job = self._jobs.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    return
+                if job is None:
+                    self._jobs.put(None)   # stop after this batch
+                    return
+                batch.append(job)
+
+        def _commit(self, batch: list) -> None:
+            conn = self._conn
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for future, fn, args in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        results.append((future, fn(conn, *args), None))
+                    except Exception as exc:
+                        conn.execute("ROLLBACK TO write")
+                        results.append((future, None, exc))
+                    conn.execute("RELEASE write")
+                conn.execute("COMMIT")
+            except Exception as exc:
+                # BEGIN or COMMIT failed (e.g. locked past busy_timeout): nothing landed.
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for future, _, _ in batch:
+                    future.set_exception(exc)
+                return
+            if metrics.ENABLED:
+                metrics.DB_WRITE_BATCH.observe(len(batch))
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def _write(fn, *args):
+        """Run ``fn(conn, *args)`` in a write transaction and return its result."""
+        global _writer
+        if GROUP_COMMIT_MS <= 0:
+            with _get_conn() as conn:
+                return fn(conn, *args)
+        if _writer is None:
+            with _writer_lock:
+                if _writer is None:
+                    _writer = _WriteQueue(GROUP_COMMIT_MS / 1000, GROUP_COMMIT_MAX)
+        return _writer.submit(fn, *args).result()
+
     def init_db() -> None:
+        # Migrations manage their own transactions, so bypass _get_conn().
+        with _get_pool().connection() as conn:
+            migrations.migrate(conn, migrations.SQLITE)
+
+    @_cached
+    @metrics.timed_query
+    def get_todo_rows(category: str | None = None, limit: int | None = None,
+                      after: tuple | None = None, before: tuple | None = None,
+                      include_archived: bool = False) -> list[tuple]:
+        """List rows newest first as tuples in ROW_COLUMNS order; see _list_query()."""
+        sql, params = _list_query("?", category, limit, after, before, include_archived)
         with _get_conn() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS todos (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    completed BOOLEAN DEFAULT 0,
-                    category TEXT NOT NULL DEFAULT 'Family',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-            )
-            columns = [row[1] for row in conn.execute("PRAGMA table_info(todos)").fetchall()]
-            if "category" not in columns:
-                conn.execute("ALTER TABLE todos ADD COLUMN category TEXT NOT NULL DEFAULT 'Family'")
+            cursor = conn.cursor()
+            cursor.row_factory = None   # plain tuples, not sqlite3.Row
+            rows = cursor.execute(sql, params).fetchall()
+        if before is not None:
+            rows.reverse()
+        return rows
 
-    def get_todos(category: str | None = None) -> list[dict]:
+    def _add(conn, title: str, category: str) -> dict:
+        version = _next_version(conn)
+        return _write_returning(
+            conn,
+            "INSERT INTO todos (title, category, version, updated_at) "
+            "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+            (title, category, version),
+        )
+
+    def _add_once(conn, title: str, category: str, key: str) -> dict | None:
+        """_add() unless ``key`` was used before; then the todo that created, if it still exists."""
+        if conn.execute("INSERT OR IGNORE INTO todo_create_keys (key) VALUES (?)", (key,)).rowcount == 0:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM todos WHERE id = (SELECT todo_id FROM todo_create_keys WHERE key = ?)",
+                (key,),
+            ).fetchone()
+            return dict(row) if row else None
+        row = _add(conn, title, category)
+        conn.execute("UPDATE todo_create_keys SET todo_id = ? WHERE key = ?", (row["id"], key))
+        conn.execute(
+            "DELETE FROM todo_create_keys WHERE created_at < datetime('now', ?)", (f"-{CREATE_KEY_DAYS} days",),
+        )
+        return row
+
+    def _conflict(conn, todo_id: int) -> None:
+        """After a versioned write matched nothing: raise VersionConflict if the todo exists."""
+        row = conn.execute(f"SELECT {_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        if row is not None:
+            raise VersionConflict(dict(row))
+
+    def _toggle(conn, todo_id: int, expected_version: int | None = None) -> dict | None:
+        version = _next_version(conn)
+        row = _write_returning(
+            conn,
+            "UPDATE todos SET completed = NOT completed, version = ?, "
+            "updated_at = CURRENT_TIMESTAMP WHERE id = ? AND (? IS NULL OR version = ?)",
+            (version, todo_id, expected_version, expected_version), todo_id,
+        )
+        if row is None and expected_version is not None:
+            _conflict(conn, todo_id)
+        return row
+
+    def _update(conn, todo_id: int, title: str | None = None, completed: bool | None = None,
+                expected_version: int | None = None) -> dict | None:
+        version = _next_version(conn)
+        row = _write_returning(
+            conn,
+            "UPDATE todos SET title = COALESCE(?, title), completed = COALESCE(?, completed), "
+            "version = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND (? IS NULL OR version = ?)",
+            (title, completed, version, todo_id, expected_version, expected_version), todo_id,
+        )
+        if row is None and expected_version is not None:
+            _conflict(conn, todo_id)
+        return row
+
+    def _delete(conn, todo_id: int) -> dict | None:
+        # Taking the version first also takes the write lock, so the row
+        # read here is the row that gets deleted.
+        version = _next_version(conn)
+        row = conn.execute(f"SELECT {_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO todo_tombstones (id, category, version) VALUES (?, ?, ?)",
+            (todo_id, row["category"], version),
+        )
+        return dict(row, version=version)
+
+    @_invalidates
+    @metrics.timed_query
+    def add_todo(title: str, category: str = "Family", with_state: bool = False) -> dict:
+        """Insert a todo; with ``with_state``, returns (row, category state), see _stateful()."""
+        return _write(_stateful(_add, with_state), title, category)
+
+    @_invalidates
+    @metrics.timed_query
+    def toggle_todo(todo_id: int, expected_version: int | None = None,
+                    with_state: bool = False) -> dict | None:
+        """Flip completed; with ``expected_version``, only from that version (else VersionConflict)."""
+        return _write(_stateful(_toggle, with_state), todo_id, expected_version)
+
+    @_invalidates
+    @metrics.timed_query
+    def update_todo(todo_id: int, title: str | None = None, completed: bool | None = None,
+                    expected_version: int | None = None, with_state: bool = False) -> dict | None:
+        """Set the fields given; with ``expected_version``, only from that version (else VersionConflict)."""
+        return _write(_stateful(_update, with_state), todo_id, title, completed, expected_version)
+
+    @_invalidates
+    @metrics.timed_query
+    def delete_todo(todo_id: int, with_state: bool = False) -> dict | None:
+        """Delete a todo, leaving a tombstone; returns the deleted row."""
+        return _write(_stateful(_delete, with_state), todo_id)
+
+    def _apply_ops(conn, ops: list[dict]) -> list[dict | None]:
+        return [_apply_op(conn, op) for op in ops]
+
+    @_invalidates
+    @metrics.timed_query
+    def apply_batch(ops: list[dict]) -> list[dict | None]:
+        """Apply a list of ops in one transaction; see _apply_op().
+
+        executemany can't hand back RETURNING rows, so ops run one by one,
+        but inside a single transaction they share one commit.
+        """
+        return _write(_apply_ops, ops)
+
+    def _clear_completed(conn, category: str) -> list[dict]:
+        version = _next_version(conn)
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM todos WHERE category = ? AND completed", (category,)
+        ).fetchall()
+        ids = [(row["id"],) for row in rows]
+        conn.executemany("DELETE FROM todos WHERE id = ?", ids)
+        conn.executemany(
+            "INSERT OR REPLACE INTO todo_tombstones (id, category, version) VALUES (?, ?, ?)",
+            [(row["id"], category, version) for row in rows],
+        )
+        return [dict(row, version=version) for row in rows]
+
+    @_invalidates
+    @metrics.timed_query
+    def clear_completed(category: str, with_state: bool = False) -> list[dict]:
+        """Delete every completed todo in a category; returns the deleted rows."""
+        return _write(_stateful(_clear_completed, with_state, category), category)
+
+    def _archive_batch(conn, older_than_days: float, batch: int) -> list[dict]:
+        rows = conn.execute(
+            f"SELECT {_COLUMNS}, completed_at FROM todos "
+            "WHERE completed AND completed_at < datetime('now', ?) ORDER BY completed_at LIMIT ?",
+            (f"-{older_than_days} days", batch),
+        ).fetchall()
+        if not rows:
+            return []
+        version = _next_version(conn)
+        conn.executemany(
+            "INSERT OR REPLACE INTO todos_archive "
+            "(id, title, completed, category, created_at, version, updated_at, completed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany("DELETE FROM todos WHERE id = ?", [(row["id"],) for row in rows])
+        conn.executemany(
+            "INSERT OR REPLACE INTO todo_tombstones (id, category, version) VALUES (?, ?, ?)",
+            [(row["id"], row["category"], version) for row in rows],
+        )
+        return [dict(zip(ROW_COLUMNS, row), version=version) for row in rows]
+
+    @_invalidates
+    @metrics.timed_query
+    def archive_completed(older_than_days: float, batch: int = ARCHIVE_BATCH) -> list[dict]:
+        """Move up to ``batch`` todos completed over ``older_than_days`` ago to todos_archive.
+
+        Each call is one short write transaction through the writer, so
+        other writes interleave between batches.  The moved rows leave
+        tombstones, so synced clients drop them.  Returns the moved rows;
+        fewer than ``batch`` means nothing else is due.
+        """
+        return _write(_archive_batch, older_than_days, batch)
+
+    @metrics.timed_query
+    def get_changes(since: int, category: str | None = None) -> dict:
+        """Rows written and ids deleted after version ``since``.
+
+        The returned ``version`` is read first, so passing it back as
+        ``since`` next time never misses a write (it may repeat a few).
+        """
+        cat = " AND category = ?" if category else ""
+        params = (since, category) if category else (since,)
+        with _get_conn() as conn:
+            version = conn.execute("SELECT version FROM sync_state").fetchone()[0]
+            todos = conn.execute(
+                f"SELECT {_COLUMNS} FROM todos WHERE version > ?{cat} ORDER BY version", params
+            ).fetchall()
+            deleted = conn.execute(
+                f"SELECT id, category, version FROM todo_tombstones WHERE version > ?{cat} ORDER BY version",
+                params,
+            ).fetchall()
+        return {
+            "version": version,
+            "todos": [dict(row) for row in todos],
+            "deleted": [dict(row) for row in deleted],
+        }
+
+    @metrics.timed_query
+    def get_version(category: str | None = None) -> int:
+        """Newest change version in a category (or overall); cheap to poll."""
         with _get_conn() as conn:
             if category:
-                rows = conn.execute(
-                    "SELECT id, title, completed, category, created_at FROM todos "
-                    "WHERE category = ? ORDER BY created_at DESC", (category,),
-                ).fetchall()
+                row = conn.execute(
+                    "SELECT version FROM category_state WHERE category = ?", (category,)
+                ).fetchone()
             else:
-                rows = conn.execute(
-                    "SELECT id, title, completed, category, created_at FROM todos "
-                    "ORDER BY created_at DESC"
-                ).fetchall()
-            return [dict(row) for row in rows]
+                row = conn.execute("SELECT version FROM sync_state").fetchone()
+        return row[0] if row else 0
+
+    def _read_category_state(conn, category: str) -> dict:
+        row = conn.execute(
+            "SELECT version, total, completed FROM category_state WHERE category = ?", (category,),
+        ).fetchone()
+        return _category_state(row and tuple(row))
 
-    def add_todo(title: str, category: str = "Family") -> dict:
+    _SEARCH_COLUMNS = ", ".join(f"t.{name}" for name in ROW_COLUMNS)
+
+    @metrics.timed_query
+    def search_todos(query: str, category: str | None = None,
+                     limit: int = 50, offset: int = 0) -> list[tuple]:
+        """Rows whose title has every word of ``query`` as a prefix, best first.
+
+        Row tuples are in ROW_COLUMNS order.  Matching uses the todos_fts
+        index; ranking is FTS5's bm25, ties newest first.
+        """
+        terms = _search_terms(query)
+        if not terms:
+            return []
+        cat = " AND t.category = ?" if category else ""
+        params = [" ".join(f'"{term}"*' for term in terms)]
+        if category:
+            params.append(category)
         with _get_conn() as conn:
-            cursor = conn.execute(
-                "INSERT INTO todos (title, category) VALUES (?, ?)", (title, category)
-            )
-            row = conn.execute(
-                "SELECT id, title, completed, category, created_at FROM todos WHERE id = ?",
-                (cursor.lastrowid,),
-            ).fetchone()
-            return dict(row)
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            return cursor.execute(
+                f"SELECT {_SEARCH_COLUMNS} FROM todos_fts f JOIN todos t ON t.id = f.rowid "
+                f"WHERE todos_fts MATCH ?{cat} ORDER BY f.rank, t.id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
 
-    def toggle_todo(todo_id: int) -> dict | None:
+    @metrics.timed_query
+    def get_stats() -> dict:
+        """Total and completed counts per category, from the trigger-kept counters."""
         with _get_conn() as conn:
-            conn.execute(
-                "UPDATE todos SET completed = NOT completed WHERE id = ?", (todo_id,)
-            )
-            row = conn.execute(
-                "SELECT id, title, completed, category, created_at FROM todos WHERE id = ?",
-                (todo_id,),
-            ).fetchone()
-            return dict(row) if row else None
+            version = conn.execute("SELECT version FROM sync_state").fetchone()[0]
+            rows = conn.execute("SELECT category, total, completed FROM category_state").fetchall()
+        return _stats(version, rows)
+
+    def export_todos(category: str | None = None, batch: int = EXPORT_BATCH):
+        """Yield lists of row tuples (ROW_COLUMNS order), oldest id first.
 
-    def update_todo(todo_id: int, title: str) -> dict | None:
+        Steps one cursor through the table a batch at a time, inside a
+        single read transaction.  Holds a pooled connection until the
+        generator is exhausted or closed.
+        """
+        where = "WHERE category = ? " if category else ""
         with _get_conn() as conn:
-            conn.execute(
-                "UPDATE todos SET title = ? WHERE id = ?", (title, todo_id)
-            )
-            row = conn.execute(
-                "SELECT id, title, completed, category, created_at FROM todos WHERE id = ?",
-                (todo_id,),
-            ).fetchone()
-            return dict(row) if row else None
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(f"SELECT {_COLUMNS} FROM todos {where}ORDER BY id", (category,) if category else ())
+            while rows := cursor.fetchmany(batch):
+                yield rows
+
+    @_rejects_as_value_error
+    @metrics.timed_query
+    def import_todos(rows: list[dict]) -> int:
+        """Upsert one chunk of rows in a single transaction; returns the count.
 
-    def delete_todo(todo_id: int) -> bool:
+        Rows are dicts with title and optional id, completed, category and
+        created_at.  A row with an existing id replaces it, a row without
+        one gets a new id.  Every row gets a fresh change version and any
+        tombstone for its id is dropped.
+        """
+        rows = _dedupe_ids(rows)
+        if not rows:
+            return 0
+        n = len(rows)
         with _get_conn() as conn:
-            cursor = conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
-            return cursor.rowcount > 0
+            last = _next_version(conn, n)
+            values = [
+                (row["title"], bool(row.get("completed", False)), row.get("category", "Family"),
+                 _sqlite_timestamp(row.get("created_at")), last - n + k, row.get("id"))
+                for k, row in enumerate(rows, 1)
+            ]
+            # Not an UPSERT: its conflict clause would override the
+            # category_state triggers' INSERT OR IGNORE.
+            ids = [row["id"] for row in rows if row.get("id") is not None]
+            # id -> current category; rows replaced under another category
+            # leave that list too.
+            existing = dict(
+                conn.execute(
+                    "SELECT id, category FROM todos WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids),),
+                ).fetchall()
+            ) if ids else {}
+            conn.executemany(
+                "UPDATE todos SET title = ?, completed = ?, category = ?, "
+                "created_at = COALESCE(?, created_at), version = ?, updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ?",
+                [v for v in values if v[-1] in existing],
+            )
+            conn.executemany(
+                "INSERT INTO todos (title, completed, category, created_at, version, id, updated_at) "
+                "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, CURRENT_TIMESTAMP)",
+                [v for v in values if v[-1] not in existing],
+            )
+            conn.executemany(
+                "DELETE FROM todo_tombstones WHERE id = ?",
+                [(row["id"],) for row in rows if row.get("id") is not None],
+            )
+        _invalidate_categories([row.get("category", "Family") for row in rows] + list(existing.values()))
+        return n
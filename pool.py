@@ -0,0 +1,184 @@
+"""A small bounded, thread-safe database connection pool.
+
+Used by models.py for both backends so each request checks out an already
+open connection instead of paying for a fresh connect/handshake.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolError(Exception):
+    """Raised when a connection cannot be checked out of the pool."""
+
+
+class ConnectionPool:
+    """Keeps between ``minsize`` and ``maxsize`` open connections.
+
+    ``connect`` opens a new connection.  ``check`` (optional) is called on
+    checkout for connections that sat idle longer than ``check_after``
+    seconds and must return False if the connection is no longer usable.
+    ``on_acquire`` (optional) is called with the seconds each checkout
+    waited, including any connect.  ``discard_on`` is the exception types
+    that leave a connection unusable (default: any); see connection().
+    """
+
+    def __init__(self, connect, minsize=1, maxsize=10, timeout=30.0,
+                 check=None, check_after=30.0, on_acquire=None, discard_on=Exception):
+        if maxsize < 1 or minsize < 0 or minsize > maxsize:
+            raise ValueError("pool sizes must satisfy 0 <= minsize <= maxsize >= 1")
+        self._connect = connect
+        self._check = check
+        self._check_after = check_after
+        self._on_acquire = on_acquire
+        self._discard_on = discard_on
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, released_at)], most recently used last
+        self._in_use = 0
+        self._closed = False
+
+        self._acquired = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak = 0
+
+        for _ in range(minsize):
+            self._idle.append((connect(), time.monotonic()))
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + self._in_use
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("pool is closed")
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self.size < self.maxsize:
+                    conn, released_at = None, None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError(f"timed out after {self.timeout}s waiting for a connection")
+                self._cond.wait(remaining)
+
+        # Connecting and health checks happen outside the lock.
+        try:
+            if conn is not None and self._check is not None \
+                    and time.monotonic() - released_at > self._check_after \
+                    and not self._safe_check(conn):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._discarded += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+            self._peak = max(self._peak, self._in_use)
+        if self._on_acquire is not None:
+            self._on_acquire(waited)
+        return conn
+
+    def release(self, conn, discard=False) -> None:
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._discarded += discard
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify_all()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of the ``with`` block.
+
+        A connection whose block raised one of ``discard_on`` (or was
+        interrupted) is discarded rather than handed to the next caller in
+        an unknown state; other exceptions return it to the pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException as exc:
+            self.release(conn, discard=not isinstance(exc, Exception) or isinstance(exc, self._discard_on))
+            raise
+        self.release(conn)
+
+    def close(self, timeout=10.0) -> None:
+        """Stop handing out connections and close them all.
+
+        Waits up to ``timeout`` seconds for checked-out connections to be
+        returned so in-flight requests can finish.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            while self._in_use:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            acquired = self._acquired
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min": self.minsize,
+                "max": self.maxsize,
+                "peak_in_use": self._peak,
+                "utilization": self._in_use / self.maxsize,
+                "acquired": acquired,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_seconds_total": self._wait_total,
+                "wait_seconds_avg": self._wait_total / acquired if acquired else 0.0,
+                "wait_seconds_max": self._wait_max,
+            }
+
+    def _safe_check(self, conn) -> bool:
+        try:
+            return bool(self._check(conn))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,344 @@
+"""Offline-first local replica of the todo store for the desktop clients.
+
+A SQLite file with the server's own schema (applied by migrations.py)
+holds a copy of every todo.  Clients read it and write to it directly,
+so a cold or unreachable server never blocks the UI.  Each local write
+is also appended to an outbox; a background thread pushes the outbox
+through ``POST /api/todos/batch`` and pulls ``GET /api/todos/changes``,
+retrying with backoff while offline.
+
+Todos created offline get negative ids until the server assigns real
+ones.  Conflicts resolve per field: an outbox op records the intent
+(set completed, set the title, delete), not the whole row, so it
+replays onto whatever the server has now, and creates carry a key so a
+batch resent after a lost reply doesn't add them twice.  A todo deleted
+on the server stays deleted.  Pulled rows never overwrite a row with ops
+still waiting to be pushed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from contextlib import contextmanager
+
+import migrations
+from models import _sqlite_timestamp
+
+PUSH_BATCH = 100
+POLL_INTERVAL = 30.0     # seconds between pulls when nothing wakes the thread
+MAX_BACKOFF = 60.0
+
+_COLUMNS = "id, title, completed, category, created_at, version, updated_at"
+
+_REPLICA_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS replica_outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        todo_id INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        body TEXT NOT NULL DEFAULT '{}'
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_replica_outbox_todo ON replica_outbox (todo_id)",
+    """
+    CREATE TABLE IF NOT EXISTS replica_state (
+        key TEXT PRIMARY KEY,
+        value
+    )
+    """,
+)
+
+
+class Replica:
+    """A local copy of the todos at ``path``, synced with the API at ``api_base``.
+
+    Reads and writes are safe from any thread.  ``on_change`` is called
+    from the sync thread whenever a sync changed local rows.
+    """
+
+    def __init__(self, path: str, api_base: str, on_change=None, timeout: float = 15):
+        self.api_base = api_base.rstrip("/")
+        self.on_change = on_change
+        self.online = False
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        migrations.migrate(self._conn, migrations.SQLITE)
+        for sql in _REPLICA_SCHEMA:
+            self._conn.execute(sql)
+
+    @contextmanager
+    def _transaction(self):
+        # The connection is in autocommit mode (migrations need that), so
+        # group each write explicitly.  Callers hold self._lock.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # --- Reads ---
+
+    def todos(self, category: str | None = None) -> list[dict]:
+        """Todos newest first, as the list endpoint orders them."""
+        where = "WHERE category = ? " if category else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM todos {where}ORDER BY created_at DESC, id DESC",
+                (category,) if category else (),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> dict:
+        """{category: {"total", "completed"}} from the trigger-kept counters."""
+        with self._lock:
+            rows = self._conn.execute("SELECT category, total, completed FROM category_state").fetchall()
+        return {category: {"total": total, "completed": completed} for category, total, completed in rows}
+
+    def pending(self) -> int:
+        """Local writes not yet accepted by the server."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM replica_outbox").fetchone()[0]
+
+    # --- Local writes ---
+
+    def _get(self, todo_id: int) -> dict | None:
+        row = self._conn.execute(f"SELECT {_COLUMNS} FROM todos WHERE id = ?", (todo_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _enqueue(self, todo_id: int, op: str, body: dict) -> None:
+        self._conn.execute(
+            "INSERT INTO replica_outbox (todo_id, op, body) VALUES (?, ?, ?)",
+            (todo_id, op, json.dumps(body)),
+        )
+
+    def add(self, title: str, category: str = "Family") -> dict:
+        with self._lock, self._transaction():
+            temp_id = min(self._conn.execute("SELECT MIN(id) FROM todos").fetchone()[0] or 0, 0) - 1
+            self._conn.execute(
+                "INSERT INTO todos (id, title, category) VALUES (?, ?, ?)", (temp_id, title, category)
+            )
+            # The key lets the server spot a create resent after a lost reply.
+            self._enqueue(temp_id, "create", {"title": title, "category": category, "key": uuid.uuid4().hex})
+            todo = self._get(temp_id)
+        self.sync_soon()
+        return todo
+
+    def _set(self, todo_id: int, **fields) -> dict | None:
+        with self._lock, self._transaction():
+            if self._get(todo_id) is None:
+                return None
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            self._conn.execute(f"UPDATE todos SET {assignments} WHERE id = ?", (*fields.values(), todo_id))
+            self._enqueue(todo_id, "update", fields)
+            todo = self._get(todo_id)
+        self.sync_soon()
+        return todo
+
+    def toggle(self, todo_id: int) -> dict | None:
+        with self._lock:
+            todo = self._get(todo_id)
+        if todo is None:
+            return None
+        # Sent as an explicit value, so replaying it can't flip the wrong way.
+        return self._set(todo_id, completed=not todo["completed"])
+
+    def update(self, todo_id: int, title: str) -> dict | None:
+        return self._set(todo_id, title=title)
+
+    def delete(self, todo_id: int) -> bool:
+        with self._lock, self._transaction():
+            if self._conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,)).rowcount == 0:
+                return False
+            if todo_id < 0:
+                # Never reached the server: forget its queued ops instead.
+                self._conn.execute("DELETE FROM replica_outbox WHERE todo_id = ?", (todo_id,))
+                return True
+            self._enqueue(todo_id, "delete", {})
+        self.sync_soon()
+        return True
+
+    # --- Sync ---
+
+    def _request(self, method: str, path: str, body=None):
+        req = urllib.request.Request(
+            self.api_base + path, method=method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=self._timeout) as resp:
+            return json.loads(resp.read())
+
+    def _store(self, todo: dict) -> bool:
+        """Write a server row locally unless local ops on it are pending."""
+        if self._conn.execute("SELECT 1 FROM replica_outbox WHERE todo_id = ?", (todo["id"],)).fetchone():
+            return False
+        values = (todo["title"], bool(todo["completed"]), todo["category"],
+                  _sqlite_timestamp(todo.get("created_at")), todo["version"],
+                  _sqlite_timestamp(todo.get("updated_at")))
+        # Not INSERT OR REPLACE: REPLACE deletes without firing the counter triggers.
+        if self._conn.execute(
+            "UPDATE todos SET title = ?, completed = ?, category = ?, created_at = ?, version = ?, "
+            "updated_at = ? WHERE id = ?", (*values, todo["id"]),
+        ).rowcount == 0:
+            self._conn.execute(
+                "INSERT INTO todos (title, completed, category, created_at, version, updated_at, id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (*values, todo["id"]),
+            )
+        return True
+
+    def _adopt(self, temp_id: int, todo: dict) -> None:
+        """Swap an offline-created row for the server's copy with its real id."""
+        local = self._get(temp_id)
+        # Delete and insert (not UPDATE id) so the search index follows the row.
+        self._conn.execute("DELETE FROM todos WHERE id = ?", (temp_id,))
+        self._conn.execute("UPDATE replica_outbox SET todo_id = ? WHERE todo_id = ?", (todo["id"], temp_id))
+        if local is None:
+            # Deleted locally while the create was in flight.
+            self._enqueue(todo["id"], "delete", {})
+            return
+        pending = self._conn.execute(
+            "SELECT 1 FROM replica_outbox WHERE todo_id = ?", (todo["id"],)
+        ).fetchone()
+        if pending:
+            # Later local edits are queued; keep showing them.
+            todo = dict(todo, title=local["title"], completed=local["completed"])
+        self._conn.execute("DELETE FROM todos WHERE id = ?", (todo["id"],))
+        self._conn.execute(
+            "INSERT INTO todos (id, title, completed, category, created_at, version, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (todo["id"], todo["title"], bool(todo["completed"]), todo["category"],
+             _sqlite_timestamp(todo.get("created_at")), todo["version"],
+             _sqlite_timestamp(todo.get("updated_at"))),
+        )
+
+    def push(self) -> bool:
+        """Send queued writes, oldest first. Returns True if local rows changed."""
+        changed = False
+        while True:
+            with self._lock:
+                queued = self._conn.execute(
+                    "SELECT seq, todo_id, op, body FROM replica_outbox ORDER BY seq LIMIT ?", (PUSH_BATCH,)
+                ).fetchall()
+            # An op on an offline-created todo waits for its create to get a real id.
+            batch, waiting = [], set()
+            for seq, todo_id, op, body in queued:
+                if todo_id in waiting or (todo_id < 0 and op != "create"):
+                    waiting.add(todo_id)
+                    continue
+                if op == "create":
+                    waiting.add(todo_id)
+                batch.append((seq, todo_id, op, json.loads(body)))
+            if not batch:
+                return changed
+
+            ops = [dict(body, op=op) if op == "create" else dict(body, op=op, id=todo_id)
+                   for _, todo_id, op, body in batch]
+            try:
+                results = self._request("POST", "/batch", {"ops": ops})["results"]
+            except urllib.error.HTTPError as exc:
+                if not 400 <= exc.code < 500 or exc.code in (408, 429):
+                    raise
+                # The server will never accept these; drop them (see below).
+                results = [{"ok": False, "status": exc.code}] * len(batch)
+
+            with self._lock, self._transaction():
+                resync = False
+                for (seq, todo_id, op, _), result in zip(batch, results):
+                    self._conn.execute("DELETE FROM replica_outbox WHERE seq = ?", (seq,))
+                    if result["ok"] and op == "create":
+                        self._adopt(todo_id, result["todo"])
+                    elif result["ok"] and op != "delete":
+                        self._store(result["todo"])
+                    elif result["status"] == 404 or todo_id < 0:
+                        # Deleted on the server, which wins over a local edit,
+                        # or a rejected create: the todo won't exist there.
+                        self._conn.execute("DELETE FROM replica_outbox WHERE todo_id = ?", (todo_id,))
+                        self._conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
+                    elif not result["ok"]:
+                        # A rejected edit left the local row ahead of the server.
+                        resync = True
+                    changed = True
+                if resync:
+                    # Pull everything again; rows without pending ops take the server's copy.
+                    self._conn.execute("DELETE FROM replica_state WHERE key = 'since'")
+
+    def pull(self) -> bool:
+        """Apply server changes since the last pull. Returns True if local rows changed."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM replica_state WHERE key = 'since'").fetchone()
+        since = row[0] if row else 0
+        changes = self._request("GET", "/changes?" + urllib.parse.urlencode({"since": since}))
+        changed = False
+        with self._lock, self._transaction():
+            for todo in changes["todos"]:
+                changed |= self._store(todo)
+            for gone in changes["deleted"]:
+                if not self._conn.execute(
+                    "SELECT 1 FROM replica_outbox WHERE todo_id = ?", (gone["id"],)
+                ).fetchone():
+                    changed |= self._conn.execute("DELETE FROM todos WHERE id = ?", (gone["id"],)).rowcount > 0
+            self._conn.execute(
+                "INSERT INTO replica_state (key, value) VALUES ('since', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (changes["version"],),
+            )
+        return changed
+
+    def sync(self) -> bool:
+        """Push, then pull. Raises OSError while the server is unreachable."""
+        changed = self.push()
+        return self.pull() or changed
+
+    def sync_soon(self) -> None:
+        """Wake the sync thread, e.g. after a write or a change notification."""
+        self._wake.set()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        delay = 0.0
+        while not self._stop.is_set():
+            try:
+                changed = self.sync()
+            except (OSError, ValueError, KeyError):
+                # urllib errors are OSErrors; a bad body is ValueError/KeyError.
+                self.online = False
+                delay = min(max(delay * 2, 1.0), MAX_BACKOFF)
+                # Back off for real: local writes don't wake the thread early.
+                self._stop.wait(delay)
+                continue
+            self.online, delay = True, 0.0
+            if changed and self.on_change:
+                self.on_change()
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._timeout)
+        with self._lock:
+            self._conn.close()
+
+
+def default_path() -> str:
+    """TODO_REPLICA_PATH, else ~/.todo-replica.db; empty disables the replica."""
+    return os.environ.get("TODO_REPLICA_PATH", os.path.join(os.path.expanduser("~"), ".todo-replica.db"))
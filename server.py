@@ -1,23 +1,91 @@
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from typing import Literal
+import asyncio
+import base64
+import io
+import json
+import logging
+import tempfile
+import zlib
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import os
 
+import compression
+import fastjson
+import metrics
 import models
+import transfer
+from events import ChangeFeed
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global static_assets
+    static_assets = compression.load_static(STATIC_DIR, STATIC_CACHE_CONTROL)
+    await asyncio.to_thread(models.init_db)
+    archiver = asyncio.create_task(_archive_loop()) if ARCHIVE_AFTER_DAYS > 0 else None
+    yield
+    if archiver is not None:
+        archiver.cancel()
+    # Let in-flight requests hand their connections back before closing;
+    # that blocks, so it waits on a worker thread, not the event loop.
+    await asyncio.to_thread(models.shutdown)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long rendering the body takes."""
+
+    def render(self, content) -> bytes:
+        with metrics.SERIALIZE_SECONDS.time():
+            return super().render(content)
 
-models.init_db()
 
-app = FastAPI(title="Todo API")
+app = FastAPI(
+    title="Todo API", lifespan=lifespan,
+    default_response_class=TimedJSONResponse if metrics.ENABLED else JSONResponse,
+)
+
+app.add_middleware(compression.CompressionMiddleware)
+
+# Outside compression, so the byte histogram counts what goes on the wire.
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Prev-Cursor", "X-Next-Offset"],
 )
 
 STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# The page's URL never changes, so browsers revalidate it every time (a
+# 304 when unchanged); other assets may be reused for an hour.
+STATIC_CACHE_CONTROL = {"index.html": "no-cache", "*": "public, max-age=3600"}
+# name -> compression.StaticAsset, loaded once in lifespan()
+static_assets: dict = {}
+
+MAX_PAGE_SIZE = 500
+MAX_BATCH_OPS = 1000
+# Import bodies larger than this are spooled to a temporary file.
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+# Todos completed this many days ago move to the archive; 0 (the default)
+# turns it off.  Archived todos are only listed with include_archived=true,
+# which the bundled clients don't ask for, so this is opt-in.
+ARCHIVE_AFTER_DAYS = float(os.environ.get("TODO_ARCHIVE_DAYS", "0"))
+ARCHIVE_INTERVAL = float(os.environ.get("TODO_ARCHIVE_INTERVAL", "3600"))
+# Pause between archive batches so queued writes get the lock in between.
+ARCHIVE_PAUSE = 0.05
+
+log = logging.getLogger("todo.archive")
+
+feed = ChangeFeed()
 
 
 class TodoCreate(BaseModel):
@@ -30,34 +98,469 @@ class TodoUpdate(BaseModel):
     completed: bool | None = None
 
 
+class BatchOp(BaseModel):
+    op: Literal["create", "update", "toggle", "delete"]
+    id: int | None = None
+    title: str | None = None
+    category: str = "Family"
+    completed: bool | None = None
+    # Client-chosen id for a create: a retry that repeats it gets the todo
+    # the first attempt created instead of a duplicate.
+    key: str | None = Field(None, max_length=64)
+
+
+class BatchRequest(BaseModel):
+    ops: list[BatchOp] = Field(max_length=MAX_BATCH_OPS)
+
+
+# Change-feed event for each kind of write.
+_EVENTS = {"create": "insert", "update": "update", "toggle": "update", "delete": "delete"}
+
+
+def _publish(kind: str, todo: dict, state: dict | None = None) -> None:
+    """Announce a write; ``state`` (from with_state) adds the category's counters.
+
+    Clients apply an event's ``stats`` only if its ``version`` is newer
+    than the counters they hold, so the echo of their own write, whose
+    reply already brought the counters, costs no /api/stats request.
+    """
+    if kind == "delete":
+        todo = {"id": todo["id"], "category": todo["category"], "version": todo["version"]}
+    payload = jsonable_encoder(todo)
+    if state is not None:
+        payload["stats"] = {"total": state["total"], "completed": state["completed"]}
+    feed.publish(_EVENTS[kind], payload)
+
+
+def _mutation(state: dict, **fields) -> dict:
+    """Write response: ``fields`` plus the category's new version and counters.
+
+    ``state`` is what the write read in its own transaction (the models'
+    ``with_state``), so it is exactly this write's effect.  Lets clients
+    patch the changed rows and their badges in place instead of
+    refetching the list and /api/stats after every write.
+    """
+    return {
+        **fields,
+        "version": state["version"],
+        "stats": {"total": state["total"], "completed": state["completed"]},
+    }
+
+
+async def _archive_loop() -> None:
+    """Archive due todos a batch at a time, every ARCHIVE_INTERVAL seconds."""
+    while True:
+        moved = 0
+        try:
+            while True:
+                rows = await asyncio.to_thread(models.archive_completed, ARCHIVE_AFTER_DAYS)
+                moved += len(rows)
+                if len(rows) < models.ARCHIVE_BATCH:
+                    break
+                await asyncio.sleep(ARCHIVE_PAUSE)
+        except Exception:
+            log.exception("archiving completed todos failed")
+        if moved:
+            log.info("archived %d completed todos", moved)
+            # Rows left every list at once; clients reload rather than
+            # receive one delete event per row.
+            feed.publish("reset", {})
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+
+
+def _static_response(name: str, accept_encoding: str | None, if_none_match: str | None) -> Response:
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    body, encoding = asset.select(accept_encoding)
+    # The encoded bytes differ from the file, so their tag is weak.
+    etag = "W/" + asset.etag if encoding else asset.etag
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if _etag_matches(if_none_match, asset.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
 @app.get("/")
-def index():
-    return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+async def index(accept_encoding: str | None = Header(None), if_none_match: str | None = Header(None)):
+    """The web client, from memory, precompressed, with a content-hash ETag."""
+    return _static_response("index.html", accept_encoding, if_none_match)
+
+
+@app.get("/static/{name}")
+async def static_file(name: str, accept_encoding: str | None = Header(None),
+                      if_none_match: str | None = Header(None)):
+    return _static_response(name, accept_encoding, if_none_match)
+
+
+@app.get("/api/health")
+async def health():
+    return {"ok": True, "pool": models.pool_stats(), "cache": models.cache_stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Latency histograms plus pool and cache gauges and counters, in Prometheus text format."""
+    pool = models.pool_stats() or {}
+    cache = models.cache_stats()
+    gauges = {
+        "todo_db_pool_size": ("Open pooled connections.", pool.get("size", 0)),
+        "todo_db_pool_in_use": ("Connections checked out.", pool.get("in_use", 0)),
+        "todo_cache_size": ("Cached list responses.", cache["size"]),
+    }
+    counters = {
+        "todo_db_pool_timeouts_total": ("Checkouts that timed out.", pool.get("timeouts", 0)),
+        "todo_cache_hits_total": ("List cache hits.", cache["hits"]),
+        "todo_cache_misses_total": ("List cache misses.", cache["misses"]),
+    }
+    return PlainTextResponse(metrics.render(gauges, counters), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+async def debug_profile(seconds: float = Query(5, gt=0, le=60), interval: float = Query(0.005, ge=0.001, le=1)):
+    """Sample all threads for ``seconds`` and return collapsed stacks.
+
+    Only available with TODO_PROFILER=1.  Feed the output to flamegraph.pl
+    or speedscope.
+    """
+    if not metrics.PROFILER:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        return await asyncio.to_thread(metrics.profile, seconds, interval)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+
+_ID = models.ROW_COLUMNS.index("id")
+_CREATED_AT = models.ROW_COLUMNS.index("created_at")
+
+
+def _encode_cursor(row: tuple) -> str:
+    created_at = row[_CREATED_AT]
+    if not isinstance(created_at, str):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, row[_ID]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Only what _encode_cursor() makes: [created_at, id], id a 64-bit int.
+    if not (isinstance(key, list) and len(key) == 2 and isinstance(key[0], str)
+            and type(key[1]) is int and -2**63 <= key[1] < 2**63):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(key)
+
+
+def _list_etag(version: int, *params) -> str:
+    # The version changes with every write to the category; the checksum
+    # tells pages of the same category apart.
+    checksum = zlib.crc32(repr(params).encode())
+    return f'"{version}-{checksum:08x}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _rows_response(rows: list[tuple], headers: dict) -> Response:
+    # Bypasses jsonable_encoder: the tuples go straight to the encoder.
+    with metrics.SERIALIZE_SECONDS.time():
+        body = fastjson.encode_rows(models.ROW_COLUMNS, rows)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/stats")
+def stats(response: Response, if_none_match: str | None = Header(None)):
+    """Total and completed todos per category.
+
+    Counts come from counters kept by database triggers, so this is one
+    small read however many todos there are.  Tagged with the global
+    change version for If-None-Match.
+    """
+    result = models.get_stats()
+    etag = f'"{result["version"]}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return result["categories"]
 
 
 @app.get("/api/todos")
-def list_todos(category: str | None = Query(None)):
-    return models.get_todos(category)
+def list_todos(
+    category: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: str | None = Query(None),
+    before: str | None = Query(None),
+    include_archived: bool = Query(False),
+    if_none_match: str | None = Header(None),
+):
+    """List todos newest first.
+
+    Without ``limit`` every matching row is returned.  With it, the page is
+    keyed on (created_at, id): pass the ``X-Next-Cursor`` response header as
+    ``after`` for older rows, or ``X-Prev-Cursor`` as ``before`` for newer.
+
+    Responses carry an ETag derived from the category's change version, so
+    a matching ``If-None-Match`` gets a 304 without reading any rows.
+
+    Archived todos (completed more than TODO_ARCHIVE_DAYS ago) are only
+    listed with ``include_archived=true``.
+    """
+    if after and before:
+        raise HTTPException(status_code=400, detail="Use either after or before, not both")
+    after_key = _decode_cursor(after) if after else None
+    before_key = _decode_cursor(before) if before else None
+
+    # Read before the rows: a write in between only makes the tag stale,
+    # which costs the client one extra full response, never a missed change.
+    version = models.get_version(category)
+    etag = _list_etag(version, category, limit, after, before, include_archived)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if limit is None:
+        rows = models.get_todo_rows(category, after=after_key, before=before_key,
+                                    include_archived=include_archived, version=version)
+        return _rows_response(rows, headers)
+
+    # One extra row tells us whether another page exists in that direction.
+    rows = models.get_todo_rows(category, limit + 1, after_key, before_key, include_archived, version)
+    more = len(rows) > limit
+    if before_key:
+        rows = rows[-limit:] if more else rows
+        has_newer, has_older = more, True
+    else:
+        rows = rows[:limit]
+        has_newer, has_older = after_key is not None, more
+    if rows and has_older:
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    if rows and has_newer:
+        headers["X-Prev-Cursor"] = _encode_cursor(rows[0])
+    return _rows_response(rows, headers)
+
+
+@app.get("/api/todos/search")
+def search_todos(
+    q: str = Query(..., min_length=1),
+    category: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    if_none_match: str | None = Header(None),
+):
+    """Todos whose title contains every word of ``q`` as a word prefix.
+
+    Results are ranked best match first.  If there are more, the
+    ``X-Next-Offset`` header holds the ``offset`` for the next page.
+    """
+    version = models.get_version(category)
+    etag = _list_etag(version, "search", q, category, limit, offset)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    rows = models.search_todos(q, category, limit + 1, offset)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return _rows_response(rows, headers)
+
+
+@app.get("/api/todos/changes")
+def todo_changes(since: int = Query(0, ge=0), category: str | None = Query(None)):
+    """Everything written or deleted after version ``since``.
+
+    Clients keep the returned ``version`` and pass it as ``since`` on the
+    next call; ``since=0`` returns every row.
+    """
+    return models.get_changes(since, category)
+
+
+@app.get("/api/todos/events")
+async def todo_events(
+    category: str | None = Query(None),
+    last_event_id: str | None = Header(None),
+    since: str | None = Query(None),
+):
+    """Server-sent events for inserts, updates and deletes.
+
+    Reconnecting clients resume with ``Last-Event-ID`` (EventSource sends
+    it automatically) or ``?since=<id>``; if the server can no longer
+    replay from there it sends a ``reset`` event and the client should
+    refetch the list.  Events for single-row writes and clear-completed
+    carry the category's counters as ``stats``; batch events don't.
+    """
+    async def stream():
+        yield "retry: 3000\n\n"
+        async for event in feed.subscribe(last_event_id or since):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            todo = event.get("todo")
+            if category and todo and todo["category"] != category:
+                continue
+            data = json.dumps(todo or {})
+            yield f"id: {feed.epoch}-{event['seq']}\nevent: {event['op']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/todos/export")
+async def export_todos(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    category: str | None = Query(None),
+):
+    """Stream every todo, oldest first, as NDJSON or CSV in constant memory."""
+    body = transfer.encode(models.export_todos(category), format, models.ROW_COLUMNS)
+    return StreamingResponse(
+        body, media_type=transfer.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+
+@app.post("/api/todos/import")
+async def import_todos(request: Request, format: Literal["ndjson", "csv"] = Query("ndjson")):
+    """Upsert todos from an NDJSON or CSV body (the export format).
+
+    Rows keep their ``id`` if given (replacing any existing todo with that
+    id) and get a fresh change version.  Rows commit in chunks of
+    ``transfer.IMPORT_CHUNK``; on a bad record (or one the database
+    refuses) the response is a 400 that says how many rows were imported
+    before it.
+    """
+    imported = 0
+
+    def progress(total: int) -> None:
+        nonlocal imported
+        imported = total
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        text = io.TextIOWrapper(spool, encoding="utf-8", newline="")
+        try:
+            await asyncio.to_thread(transfer.load, text, format, models.import_todos,
+                                    transfer.IMPORT_CHUNK, progress)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        finally:
+            text.detach()
+            # Far too many rows to stream one by one; whether or not the
+            # import got to the end, tell listeners to refetch.
+            if imported:
+                feed.publish("reset", {})
+    return {"ok": True, "imported": imported}
 
 
 @app.post("/api/todos", status_code=201)
 def create_todo(body: TodoCreate):
-    return models.add_todo(body.title, body.category)
+    """Add a todo; the reply is ``{"todo", "version", "stats"}``."""
+    result, state = models.add_todo(body.title, body.category, True)
+    _publish("create", result, state)
+    return _mutation(state, todo=result)
+
+
+@app.post("/api/todos/batch")
+def batch_todos(body: BatchRequest):
+    """Apply mixed create/update/toggle/delete ops in one transaction.
+
+    Returns one result per op, in order: ``{"ok": true, "todo": ...}`` or
+    ``{"ok": false, "status": 404, ...}`` for ids that do not exist.  A
+    missing id does not abort the rest of the batch.  A create with a
+    ``key`` already used returns the todo created then, so a client may
+    safely resend a batch whose reply it never got.
+    """
+    for i, op in enumerate(body.ops):
+        if op.op == "create" and op.title is None:
+            raise HTTPException(status_code=422, detail=f"ops[{i}]: create needs a title")
+        if op.op != "create" and op.id is None:
+            raise HTTPException(status_code=422, detail=f"ops[{i}]: {op.op} needs an id")
+        if op.op == "update" and op.title is None and op.completed is None:
+            raise HTTPException(status_code=422, detail=f"ops[{i}]: update needs title or completed")
+
+    rows = models.apply_batch([op.model_dump() for op in body.ops])
+    results = []
+    for op, row in zip(body.ops, rows):
+        if row is None:
+            results.append({"op": op.op, "ok": False, "status": 404, "detail": "Todo not found"})
+            continue
+        _publish(op.op, row)
+        results.append({"op": op.op, "ok": True, "todo": row})
+    return {"results": results}
+
+
+@app.delete("/api/todos/completed")
+def clear_completed(category: str = Query(...)):
+    """Delete every completed todo in a category in one statement.
+
+    The reply carries the category's new ``version`` and ``stats`` too.
+    """
+    deleted, state = models.clear_completed(category, True)
+    for row in deleted:
+        _publish("delete", row, state)
+    return _mutation(state, ok=True, deleted=[row["id"] for row in deleted])
+
+
+def _if_match_version(if_match: str | None) -> int | None:
+    """The row version an If-Match header asks for; None if unconditional."""
+    if not if_match or if_match.strip() == "*":
+        return None
+    tag = if_match.strip().removeprefix("W/").strip('"')
+    try:
+        return int(tag)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a todo version")
 
 
 @app.put("/api/todos/{todo_id}")
-def update_todo(todo_id: int, body: TodoUpdate):
-    if body.title is not None:
-        result = models.update_todo(todo_id, body.title)
-    else:
-        result = models.toggle_todo(todo_id)
+def update_todo(todo_id: int, body: TodoUpdate, response: Response,
+                      if_match: str | None = Header(None)):
+    """Set ``title`` and/or ``completed``; an empty body toggles completed.
+
+    The reply is ``{"todo", "version", "stats"}``, as for POST.  With
+    ``If-Match: "<version>"`` the write only applies if the todo is still
+    at that version; otherwise the reply is 409 with the current row, so
+    the client can redraw it instead of refetching the list.
+    """
+    expected = _if_match_version(if_match)
+    try:
+        if body.title is not None or body.completed is not None:
+            result, state = models.update_todo(todo_id, body.title, body.completed, expected, True)
+        else:
+            result, state = models.toggle_todo(todo_id, expected, True)
+    except models.VersionConflict as conflict:
+        current = conflict.current
+        return JSONResponse(
+            {"detail": "Version mismatch", "todo": jsonable_encoder(current)},
+            status_code=409, headers={"ETag": f'"{current["version"]}"'},
+        )
     if result is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    return result
+    _publish("update", result, state)
+    response.headers["ETag"] = f'"{result["version"]}"'
+    return _mutation(state, todo=result)
 
 
 @app.delete("/api/todos/{todo_id}")
 def delete_todo(todo_id: int):
-    if not models.delete_todo(todo_id):
+    """Delete a todo; the reply is ``{"ok", "todo", "version", "stats"}``."""
+    deleted, state = models.delete_todo(todo_id, True)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Todo not found")
-    return {"ok": True}
+    _publish("delete", deleted, state)
+    return _mutation(state, ok=True, todo=deleted)
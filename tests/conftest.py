@@ -0,0 +1,11 @@
+"""Every test module shares one scratch SQLite file, set before models is imported."""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["TODO_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "todos.db")
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("TODO_CACHE_BUS", None)
+sys.path.insert(0, ROOT)
@@ -0,0 +1,40 @@
+"""The list cache must not outlive writes it was never told about."""
+
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.environ["TODO_DB_PATH"]   # see conftest.py
+
+
+def _add_in_other_process(title: str) -> None:
+    # Stands in for another uvicorn worker or `todo.py import`: its
+    # invalidation never reaches this process's LocalBus.
+    subprocess.run(
+        [sys.executable, "-c", f"import models; models.add_todo({title!r}, 'Family'); models.shutdown()"],
+        cwd=ROOT, env=dict(os.environ, TODO_DB_PATH=DB_PATH), check=True,
+    )
+
+
+def test_list_reflects_write_from_other_process():
+    with TestClient(server.app) as client:
+        client.post("/api/todos", json={"title": "one", "category": "Family"})
+        first = client.get("/api/todos", params={"category": "Family"})
+        assert [t["title"] for t in first.json()] == ["one"]
+
+        _add_in_other_process("two")
+
+        second = client.get("/api/todos", params={"category": "Family"},
+                            headers={"If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 200
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert [t["title"] for t in second.json()] == ["two", "one"]
+
+        third = client.get("/api/todos", params={"category": "Family"},
+                           headers={"If-None-Match": second.headers["ETag"]})
+        assert third.status_code == 304
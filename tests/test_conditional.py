@@ -0,0 +1,50 @@
+"""PUT with If-Match applies only at the expected version; a miss is a 409."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import models
+import server
+
+
+@pytest.fixture(params=[models.GROUP_COMMIT_MS, 0], ids=["group-commit", "per-call"])
+def client(request, monkeypatch):
+    monkeypatch.setattr(models, "GROUP_COMMIT_MS", request.param)
+    with TestClient(server.app) as client:
+        yield client
+
+
+def test_matching_version_applies(client):
+    todo = client.post("/api/todos", json={"title": "a", "category": "Conditional"}).json()["todo"]
+    reply = client.put(f"/api/todos/{todo['id']}", json={"title": "b"},
+                       headers={"If-Match": f'"{todo["version"]}"'})
+    assert reply.status_code == 200
+    assert reply.json()["todo"]["title"] == "b"
+    assert reply.headers["ETag"] == f'"{reply.json()["todo"]["version"]}"'
+
+
+def test_stale_version_is_409_and_changes_nothing(client):
+    todo = client.post("/api/todos", json={"title": "a", "category": "Conditional"}).json()["todo"]
+    current = client.put(f"/api/todos/{todo['id']}", json={}).json()["todo"]
+    version = models.get_version()
+    discarded = models.pool_stats()["discarded"]
+
+    for body in ({"title": "lost"}, {}):
+        reply = client.put(f"/api/todos/{todo['id']}", json=body,
+                           headers={"If-Match": f'"{todo["version"]}"'})
+        assert reply.status_code == 409
+        assert reply.headers["ETag"] == f'"{current["version"]}"'
+        assert reply.json()["todo"] == current
+
+    assert models.get_version() == version
+    # An expected conflict must not cost a pooled connection.
+    assert models.pool_stats()["discarded"] == discarded
+
+
+def test_if_match_on_missing_todo_is_404(client):
+    assert client.put("/api/todos/999999", json={}, headers={"If-Match": '"1"'}).status_code == 404
+
+
+def test_malformed_if_match_is_400(client):
+    todo = client.post("/api/todos", json={"title": "a", "category": "Conditional"}).json()["todo"]
+    assert client.put(f"/api/todos/{todo['id']}", json={}, headers={"If-Match": "soon"}).status_code == 400
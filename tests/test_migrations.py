@@ -0,0 +1,54 @@
+"""Databases made by the original init_db() upgrade in place."""
+
+import sqlite3
+
+import migrations
+import models
+
+_BASELINE_TODOS = """
+    CREATE TABLE todos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        completed BOOLEAN DEFAULT 0,
+        category TEXT NOT NULL DEFAULT 'Family',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def test_baseline_database_upgrades(tmp_path):
+    conn = sqlite3.connect(tmp_path / "todos.db", isolation_level=None)
+    conn.execute(_BASELINE_TODOS)
+    conn.executemany(
+        "INSERT INTO todos (title, completed, category) VALUES (?, ?, ?)",
+        [("milk", 1, "Family"), ("eggs", 0, "Family"), ("run", 0, "Ruiqi")],
+    )
+
+    applied = migrations.migrate(conn, migrations.SQLITE)
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.migrate(conn, migrations.SQLITE) == []
+
+    rows = conn.execute("SELECT id, title, version, completed_at IS NOT NULL FROM todos ORDER BY id").fetchall()
+    assert rows == [(1, "milk", 1, 1), (2, "eggs", 2, 0), (3, "run", 3, 0)]
+    assert conn.execute("SELECT version FROM sync_state").fetchone() == (3,)
+    state = conn.execute("SELECT category, version, total, completed FROM category_state ORDER BY category")
+    assert ("Family", 2, 2, 1) in state.fetchall()
+    conn.close()
+
+
+def test_database_without_categories_upgrades(tmp_path):
+    conn = sqlite3.connect(tmp_path / "todos.db", isolation_level=None)
+    conn.execute("CREATE TABLE todos (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                 "completed BOOLEAN DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("INSERT INTO todos (title) VALUES ('old')")
+
+    migrations.migrate(conn, migrations.SQLITE)
+    assert conn.execute("SELECT title, category FROM todos").fetchall() == [("old", "Family")]
+    conn.close()
+
+
+def test_pooled_connections_are_tuned():
+    models.init_db()
+    with models._get_pool().connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
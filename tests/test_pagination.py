@@ -0,0 +1,49 @@
+"""Keyset cursors chain pages, and a cursor we didn't issue is a 400."""
+
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursors_walk_the_list_both_ways():
+    with TestClient(server.app) as client:
+        for title in ("one", "two", "three"):
+            client.post("/api/todos", json={"title": title, "category": "Paging"})
+
+        first = client.get("/api/todos", params={"category": "Paging", "limit": 2})
+        assert [t["title"] for t in first.json()] == ["three", "two"]
+        assert "X-Prev-Cursor" not in first.headers
+
+        second = client.get("/api/todos", params={"category": "Paging", "limit": 2,
+                                                  "after": first.headers["X-Next-Cursor"]})
+        assert [t["title"] for t in second.json()] == ["one"]
+        assert "X-Next-Cursor" not in second.headers
+
+        back = client.get("/api/todos", params={"category": "Paging", "limit": 2,
+                                                "before": second.headers["X-Prev-Cursor"]})
+        assert [t["title"] for t in back.json()] == ["three", "two"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _cursor(5),
+    _cursor(None),
+    _cursor({"created_at": "2024-01-01", "id": 1}),
+    _cursor(["2024-01-01"]),
+    _cursor(["2024-01-01", "1"]),
+    _cursor(["2024-01-01", True]),
+    _cursor(["2024-01-01", 10**30]),
+])
+def test_malformed_cursor_is_400(cursor):
+    with TestClient(server.app) as client:
+        response = client.get("/api/todos", params={"limit": 2, "after": cursor})
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Invalid cursor"}
@@ -0,0 +1,78 @@
+"""ConnectionPool hands connections back out, and drops only broken ones."""
+
+import threading
+
+import pytest
+
+from pool import ConnectionPool, PoolError
+
+
+class DriverError(Exception):
+    pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(**kwargs) -> ConnectionPool:
+    return ConnectionPool(FakeConn, **{"minsize": 0, "maxsize": 2, "discard_on": DriverError, **kwargs})
+
+
+def test_released_connection_is_reused():
+    pool = _pool()
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["acquired"], stats["discarded"]) == (1, 1, 2, 0)
+
+
+def test_driver_error_discards_the_connection():
+    pool = _pool()
+    with pytest.raises(DriverError):
+        with pool.connection() as conn:
+            raise DriverError
+    assert conn.closed
+    with pool.connection() as fresh:
+        assert fresh is not conn
+    assert pool.stats()["discarded"] == 1
+
+
+def test_application_error_keeps_the_connection():
+    pool = _pool()
+    with pytest.raises(KeyError):
+        with pool.connection() as conn:
+            raise KeyError("not a driver problem")
+    assert not conn.closed
+    with pool.connection() as again:
+        assert again is conn
+    assert pool.stats()["discarded"] == 0
+
+
+def test_failed_health_check_replaces_an_idle_connection():
+    pool = _pool(check=lambda conn: conn.healthy, check_after=0)
+    with pool.connection() as conn:
+        conn.healthy = False
+    with pool.connection() as fresh:
+        assert fresh is not conn
+    assert conn.closed
+
+
+def test_checkout_times_out_when_exhausted():
+    pool = _pool(maxsize=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    # A release wakes a waiter instead of letting it time out.
+    pool.timeout = 5
+    threading.Timer(0.05, pool.release, (held,)).start()
+    assert pool.acquire() is held
@@ -0,0 +1,42 @@
+"""Imports reject bad records with a 400 and keep listeners in step."""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+import transfer
+
+
+def _ndjson(*records) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+@pytest.mark.parametrize("record", [
+    {"title": "x", "category": 5},
+    {"title": "x", "id": 1e30},
+    {"title": "x", "id": 2**40},
+    {"title": "x", "id": 0},
+    {"title": "x", "id": True},
+    {"title": "x", "id": "abc"},
+])
+def test_bad_record_is_400(record):
+    with TestClient(server.app) as client:
+        response = client.post("/api/todos/import", content=_ndjson(record))
+        assert response.status_code == 400
+        assert "line 1" in response.json()["detail"]
+
+
+def test_partial_import_publishes_reset(monkeypatch):
+    monkeypatch.setattr(transfer, "IMPORT_CHUNK", 1)
+    with TestClient(server.app) as client:
+        before = server.feed.last_id
+        body = _ndjson({"title": "kept", "category": "Imported"}, {"title": "x", "id": "bad"})
+        response = client.post("/api/todos/import", content=body)
+        assert response.status_code == 400
+        assert "(1 rows before it were imported)" in response.json()["detail"]
+        assert [event["op"] for event in server.feed.since(int(before.split("-")[1]))] == ["reset"]
+
+        listed = client.get("/api/todos", params={"category": "Imported"})
+        assert [t["title"] for t in listed.json()] == ["kept"]
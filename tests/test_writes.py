@@ -0,0 +1,42 @@
+"""Write replies and list responses agree with each other and the counters."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import models
+import server
+
+
+def test_list_serializes_rows_as_the_write_returned_them():
+    with TestClient(server.app) as client:
+        created = [client.post("/api/todos", json={"title": title, "category": "Serial"}).json()["todo"]
+                   for title in ("a", "b")]
+        listed = client.get("/api/todos", params={"category": "Serial"})
+        assert listed.headers["content-type"] == "application/json"
+        assert listed.json() == created[::-1]
+
+
+def test_group_committed_writes_report_their_own_state():
+    assert models.GROUP_COMMIT_MS > 0
+    with TestClient(server.app) as client:
+        def add(i):
+            return client.post("/api/todos", json={"title": f"t{i}", "category": "Grouped"}).json()
+
+        with ThreadPoolExecutor(8) as pool:
+            replies = list(pool.map(add, range(32)))
+
+        versions = [reply["todo"]["version"] for reply in replies]
+        assert len(set(versions)) == len(versions)
+        for reply in replies:
+            assert reply["version"] == reply["todo"]["version"]
+        # Each reply's counters are its own write's effect: the n-th
+        # version committed saw n todos.
+        totals = [reply["stats"]["total"] for reply in sorted(replies, key=lambda r: r["version"])]
+        assert totals == list(range(1, 33))
+
+        toggled = client.put(f"/api/todos/{replies[0]['todo']['id']}", json={}).json()
+        assert toggled["stats"] == {"total": 32, "completed": 1}
+        assert client.get("/api/stats").json()["Grouped"] == {"total": 32, "completed": 1}
+        assert client.get("/api/todos/changes", params={"since": max(versions)}).json()["version"] \
+            == toggled["version"]
@@ -3,6 +3,9 @@
 Usage:
     python todo.py          Launch GUI (connects to cloud API)
     python todo.py serve    Start the API server locally
+    python todo.py bench    Load-test the API (see bench.py for options)
+    python todo.py export   Dump the store as NDJSON/CSV (see transfer.py)
+    python todo.py import   Load an export into the store
 """
 
 import sys
@@ -18,6 +21,18 @@ def run_serve():
     uvicorn.run("server:app", host="0.0.0.0", port=8000, log_level="info")
 
 
+def run_bench(argv):
+    """Seed a store and replay a request mix against the API."""
+    import bench
+    bench.main(argv)
+
+
+def run_transfer(argv):
+    """Export or import the local store (DATABASE_URL or the SQLite file)."""
+    import transfer
+    transfer.main(argv)
+
+
 def run_gui():
     """Launch the GUI (talks to the cloud API)."""
     from gui import TodoApp
@@ -28,6 +43,10 @@ def main():
     if len(sys.argv) > 1 and sys.argv[1] == "serve":
         os.chdir(PROJECT_DIR)
         run_serve()
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        run_bench(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] in ("export", "import"):
+        run_transfer(sys.argv[1:])
     else:
         run_gui()
 
@@ -0,0 +1,190 @@
+"""Streaming export and import of the todo store as NDJSON or CSV.
+
+Shared by ``GET /api/todos/export``, ``POST /api/todos/import`` and the
+command line:
+
+    python todo.py export [--format ndjson|csv] [--category C] [-o FILE]
+    python todo.py import FILE [--format ndjson|csv] [--chunk 5000]
+
+The CLI works on whichever store models.py is configured for
+(DATABASE_URL, else the SQLite file), so exporting with one and importing
+with the other moves the data between backends.  Both directions run in
+constant memory: exports stream from a cursor, imports commit one chunk
+at a time.
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import sys
+
+import fastjson
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+IMPORT_CHUNK = 5000
+# todos.id is an INTEGER on PostgreSQL; SQLite ids fit too.
+MAX_ID = 2**31 - 1
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n", ""}
+
+
+def encode(batches, fmt: str, columns: tuple):
+    """Yield export bytes for an iterable of row-tuple batches."""
+    if fmt == "ndjson":
+        for rows in batches:
+            yield b"".join(fastjson.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _normalize(record, line: int) -> dict:
+    """Validate one imported record into the dict models.import_todos() takes."""
+    if not isinstance(record, dict):
+        raise ValueError(f"line {line}: expected an object")
+    title = record.get("title")
+    if not isinstance(title, str) or not title:
+        raise ValueError(f"line {line}: title is required")
+    category = record.get("category") or "Family"
+    if not isinstance(category, str):
+        raise ValueError(f"line {line}: bad category {category!r}")
+    row = {"title": title, "category": category}
+
+    todo_id = record.get("id")
+    if todo_id not in (None, ""):
+        # An int, or digits from CSV; not a float or a bool.
+        try:
+            row["id"] = int(todo_id) if isinstance(todo_id, str) or type(todo_id) is int else None
+        except ValueError:
+            row["id"] = None
+        if row["id"] is None or not 1 <= row["id"] <= MAX_ID:
+            raise ValueError(f"line {line}: bad id {todo_id!r}")
+
+    completed = record.get("completed", False)
+    if isinstance(completed, str):
+        if completed.strip().lower() not in _TRUE | _FALSE:
+            raise ValueError(f"line {line}: bad completed {completed!r}")
+        completed = completed.strip().lower() in _TRUE
+    row["completed"] = bool(completed)
+
+    created_at = record.get("created_at")
+    if created_at:
+        try:
+            datetime.datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError(f"line {line}: bad created_at {created_at!r}")
+        row["created_at"] = created_at
+    return row
+
+
+def read_rows(f, fmt: str):
+    """Yield normalized rows from a text file; raises ValueError on bad input."""
+    if fmt == "ndjson":
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError:
+                raise ValueError(f"line {line}: invalid JSON")
+            yield _normalize(record, line)
+    else:
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield _normalize(record, reader.line_num)
+
+
+def load(f, fmt: str, import_chunk, chunk: int = IMPORT_CHUNK, progress=None) -> int:
+    """Import rows from ``f`` through ``import_chunk`` (models.import_todos).
+
+    Each chunk commits on its own, so a bad record stops the import with
+    the earlier chunks already applied; the error says how many.
+    """
+    total = 0
+    batch = []
+    try:
+        for row in read_rows(f, fmt):
+            batch.append(row)
+            if len(batch) >= chunk:
+                total += import_chunk(batch)
+                batch = []
+                if progress:
+                    progress(total)
+        if batch:
+            total += import_chunk(batch)
+            if progress:
+                progress(total)
+    except ValueError as exc:
+        raise ValueError(f"{exc} ({total} rows before it were imported)") from exc
+    return total
+
+
+def _guess_format(path: str | None, default: str = "ndjson") -> str:
+    if path and path.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="todo.py", description="Export or import todos.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every todo to a file or stdout")
+    export.add_argument("--format", choices=FORMATS)
+    export.add_argument("--category")
+    export.add_argument("-o", "--output", help="default: stdout")
+    load_cmd = sub.add_parser("import", help="upsert todos from a file or stdin ('-')")
+    load_cmd.add_argument("file")
+    load_cmd.add_argument("--format", choices=FORMATS)
+    load_cmd.add_argument("--chunk", type=int, default=IMPORT_CHUNK, help="rows per transaction")
+    args = parser.parse_args(argv)
+
+    import models
+    models.init_db()
+    try:
+        if args.command == "export":
+            fmt = args.format or _guess_format(args.output)
+            out = open(args.output, "wb") if args.output else sys.stdout.buffer
+            try:
+                for data in encode(models.export_todos(args.category), fmt, models.ROW_COLUMNS):
+                    out.write(data)
+            finally:
+                if args.output:
+                    out.close()
+        else:
+            fmt = args.format or _guess_format(args.file)
+            f = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+            try:
+                total = load(f, fmt, models.import_todos, args.chunk,
+                             progress=lambda n: print(f"\rimported {n} rows", end="", file=sys.stderr))
+            except ValueError as exc:
+                print(f"\nerror: {exc}", file=sys.stderr)
+                sys.exit(1)
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+            print(f"\rimported {total} rows", file=sys.stderr)
+    finally:
+        models.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import asyncio
+import json
+
 import httpx
 from textual.app import App, ComposeResult
 from textual.binding import Binding
@@ -6,6 +9,8 @@ from textual.widgets import Header, Footer, Static, Input, ListView, ListItem
 from textual.screen import ModalScreen
 
 API_BASE = "http://localhost:8000/api/todos"
+STATS_URL = "http://localhost:8000/api/stats"
+PAGE_SIZE = 50
 
 
 class TodoItem(ListItem):
@@ -15,12 +20,24 @@ class TodoItem(ListItem):
         super().__init__()
         self.todo = todo
 
-    def compose(self) -> ComposeResult:
+    def _label(self) -> str:
         check = "[x]" if self.todo["completed"] else "[ ]"
         title = self.todo["title"]
         if self.todo["completed"]:
             title = f"[strike]{title}[/strike]"
-        yield Static(f" {check}  {title}", markup=True)
+        return f" {check}  {title}"
+
+    def compose(self) -> ComposeResult:
+        yield Static(self._label(), markup=True)
+
+    def update_todo(self, todo: dict) -> None:
+        """Show a newer version of the same todo without remounting."""
+        if (todo["title"], todo["completed"]) == (self.todo["title"], self.todo["completed"]):
+            self.todo = todo
+            return
+        self.todo = todo
+        if self.is_mounted:
+            self.query_one(Static).update(self._label())
 
 
 class AddScreen(ModalScreen[str]):
@@ -107,52 +124,255 @@ class TodoApp(App):
         yield Footer()
 
     async def on_mount(self) -> None:
+        # One pooled client for the app's lifetime; the event stream
+        # holds one connection and API calls reuse the others.
+        self.client = httpx.AsyncClient(timeout=10)
+        # The loaded rows, in list order; self.todos[i] is shown by the
+        # i-th TodoItem, and self._items finds an item by todo id.
+        self.todos: list[dict] = []
+        self._items: dict[int, TodoItem] = {}
+        self.next_cursor: str | None = None
+        self._loading_more = False
+        # after-cursor -> (etag, todos, next_cursor) from the last full response
+        self._page_cache: dict = {}
+        # Per-category {"total", "completed"} from the server's counters.
+        self.stats: dict = {}
+        # category -> change version self.stats reflects for it
+        self._stats_versions: dict[str, int] = {}
         await self.refresh_todos()
+        self.run_worker(self._listen_events(), exclusive=True)
 
-    async def refresh_todos(self) -> None:
+    async def on_unmount(self) -> None:
+        await self.client.aclose()
+
+    async def _fetch_page(self, after: str | None = None) -> tuple[list[dict], str | None] | None:
+        """Fetch one page of todos; None if the server is unreachable."""
+        params = {"limit": PAGE_SIZE}
+        if after:
+            params["after"] = after
+        cached = self._page_cache.get(after)
+        headers = {"If-None-Match": cached[0]} if cached else {}
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(API_BASE)
+            resp = await self.client.get(API_BASE, params=params, headers=headers)
+            if resp.status_code != 304:
                 resp.raise_for_status()
-                todos = resp.json()
-        except httpx.ConnectError:
+        except httpx.HTTPError:
             self.query_one("#status", Static).update(
                 " Could not connect to server. Is it running?"
             )
+            return None
+        if resp.status_code == 304 and cached:
+            return list(cached[1]), cached[2]
+        todos, next_cursor = resp.json(), resp.headers.get("X-Next-Cursor")
+        if "ETag" in resp.headers:
+            self._page_cache[after] = (resp.headers["ETag"], todos, next_cursor)
+        return list(todos), next_cursor
+
+    async def refresh_todos(self) -> None:
+        page = await self._fetch_page()
+        if page is None:
             return
+        todos, self.next_cursor = page
+        await self._fetch_stats()
+        await self._sync(todos)
+        self._update_status()
+
+    async def _fetch_stats(self) -> None:
+        try:
+            resp = await self.client.get(STATS_URL)
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            return
+        # The tag is the change version the counts were read at; keep any
+        # category whose counts from a reply or event are newer.
+        tag = resp.headers.get("ETag", "").removeprefix("W/").strip('"')
+        version = int(tag) if tag.isdigit() else 0
+        for category, counts in resp.json().items():
+            self._set_counts(category, counts, version)
+
+    def _set_counts(self, category: str, counts: dict, version: int) -> bool:
+        """Keep the newest counts per category; True if these were taken."""
+        if version < self._stats_versions.get(category, 0):
+            return False
+        self.stats[category] = counts
+        self._stats_versions[category] = version
+        return True
 
+    async def _sync(self, todos: list[dict]) -> None:
+        """Make the list show ``todos``, touching only the rows that differ.
+
+        Rows that are gone are removed, rows still present are updated in
+        place, and new ones are mounted at their position.
+        """
         lv = self.query_one("#todo-list", ListView)
-        lv.clear()
-        for todo in todos:
-            lv.append(TodoItem(todo))
+        keep = {todo["id"] for todo in todos}
+        for index in range(len(self.todos) - 1, -1, -1):
+            if self.todos[index]["id"] not in keep:
+                await self._pop(lv, index)
+        for index, todo in enumerate(todos):
+            if index < len(self.todos) and self.todos[index]["id"] == todo["id"]:
+                self.todos[index] = todo
+                self._items[todo["id"]].update_todo(todo)
+                continue
+            if todo["id"] in self._items:
+                # Moved: rare, since the order is by creation time.
+                await self._pop(lv, self._index(todo["id"]))
+            await self._insert(lv, index, todo)
+
+    def _index(self, todo_id: int) -> int:
+        return next(i for i, t in enumerate(self.todos) if t["id"] == todo_id)
+
+    async def _insert(self, lv: ListView, index: int, todo: dict) -> None:
+        item = TodoItem(todo)
+        self.todos.insert(index, todo)
+        self._items[todo["id"]] = item
+        await lv.insert(index, [item])
+
+    async def _pop(self, lv: ListView, index: int) -> None:
+        todo = self.todos.pop(index)
+        del self._items[todo["id"]]
+        await lv.pop(index)
+
+    async def _upsert(self, todo: dict) -> None:
+        """Apply a created or changed todo to the rows already loaded."""
+        item = self._items.get(todo["id"])
+        if item is not None:
+            self.todos[self._index(todo["id"])] = todo
+            item.update_todo(todo)
+        else:
+            await self._insert(self.query_one("#todo-list", ListView), 0, todo)
+
+    async def _remove(self, todo_id: int) -> None:
+        if todo_id in self._items:
+            await self._pop(self.query_one("#todo-list", ListView), self._index(todo_id))
+
+    async def _listen_events(self) -> None:
+        """Follow the server's change stream and patch the local list."""
+        last_id = None
+        while True:
+            headers = {"Last-Event-ID": last_id} if last_id else {}
+            try:
+                async with self.client.stream("GET", f"{API_BASE}/events", headers=headers,
+                                              timeout=None) as resp:
+                    event, data = None, ""
+                    async for line in resp.aiter_lines():
+                        if line.startswith("id:"):
+                            last_id = line[3:].strip()
+                        elif line.startswith("event:"):
+                            event = line[6:].strip()
+                        elif line.startswith("data:"):
+                            data += line[5:].strip()
+                        elif not line and event:
+                            await self._apply_event(event, json.loads(data or "{}"))
+                            event, data = None, ""
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(3)
+
+    async def _apply_event(self, event: str, todo: dict) -> None:
+        if event == "reset":
+            await self.refresh_todos()
+            return
+        # The echo of our own write carries counts no newer than its reply.
+        counts = todo.pop("stats", None)
+        if counts is None and todo["version"] > self._stats_versions.get(todo["category"], 0):
+            await self._fetch_stats()
+        elif counts is not None:
+            self._set_counts(todo["category"], counts, todo["version"])
+        if event == "insert":
+            await self._upsert(todo)
+        elif event == "update":
+            if todo["id"] in self._items:
+                await self._upsert(todo)
+        elif event == "delete":
+            await self._remove(todo["id"])
+        self._update_status()
+
+    async def load_more(self) -> None:
+        """Append the next page below the rows already shown."""
+        if not self.next_cursor or self._loading_more:
+            return
+        self._loading_more = True
+        try:
+            page = await self._fetch_page(self.next_cursor)
+        finally:
+            self._loading_more = False
+        if page is None:
+            return
+        todos, self.next_cursor = page
+        # Rows can shift between pages while we scroll; skip any already shown.
+        todos = [todo for todo in todos if todo["id"] not in self._items]
+        items = [TodoItem(todo) for todo in todos]
+        self.todos.extend(todos)
+        self._items.update((todo["id"], item) for todo, item in zip(todos, items))
+        await self.query_one("#todo-list", ListView).extend(items)
+        self._update_status()
 
-        remaining = sum(1 for t in todos if not t["completed"])
+    def _update_status(self) -> None:
+        total = sum(s["total"] for s in self.stats.values())
+        remaining = total - sum(s["completed"] for s in self.stats.values())
         self.query_one("#status", Static).update(
-            f" {remaining} remaining of {len(todos)} total"
+            f" {remaining} remaining of {total} total"
         )
 
+    async def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:
+        # Fetch the next page when the cursor reaches the last loaded row.
+        lv = event.list_view
+        if self.next_cursor and lv.index is not None and lv.index >= len(lv.children) - 1:
+            await self.load_more()
+
+    async def _send(self, method: str, url: str, **kwargs) -> dict | None:
+        """Make an API call on the shared client; None (and a status) on failure.
+
+        A 409 from a versioned write returns ``{"todo": current row}``.
+        """
+        try:
+            resp = await self.client.request(method, url, **kwargs)
+            if resp.status_code == 409:
+                return {"todo": resp.json()["todo"]}
+            resp.raise_for_status()
+        except httpx.HTTPError as exc:
+            self.query_one("#status", Static).update(f" Request failed: {exc}")
+            return None
+        return resp.json() if resp.content else {}
+
+    async def _apply_counts(self, category: str, reply: dict) -> None:
+        """Take a category's counters from a write reply, or refetch them."""
+        if "stats" in reply:
+            self._set_counts(category, reply["stats"], reply["version"])
+        else:
+            await self._fetch_stats()
+        self._update_status()
+
     async def action_add(self) -> None:
         title = await self.push_screen_wait(AddScreen())
         if title:
-            async with httpx.AsyncClient() as client:
-                await client.post(API_BASE, json={"title": title})
-            await self.refresh_todos()
+            reply = await self._send("POST", API_BASE, json={"title": title})
+            if reply:
+                await self._upsert(reply["todo"])
+                await self._apply_counts(reply["todo"]["category"], reply)
 
     async def action_toggle(self) -> None:
         lv = self.query_one("#todo-list", ListView)
         if lv.highlighted_child and isinstance(lv.highlighted_child, TodoItem):
-            todo_id = lv.highlighted_child.todo["id"]
-            async with httpx.AsyncClient() as client:
-                await client.put(f"{API_BASE}/{todo_id}", json={})
-            await self.refresh_todos()
+            current = lv.highlighted_child.todo
+            reply = await self._send(
+                "PUT", f"{API_BASE}/{current['id']}",
+                json={"completed": not current["completed"]},
+                headers={"If-Match": f'"{current.get("version")}"'},
+            )
+            if reply:
+                await self._upsert(reply["todo"])
+                await self._apply_counts(current["category"], reply)
 
     async def action_delete(self) -> None:
         lv = self.query_one("#todo-list", ListView)
         if lv.highlighted_child and isinstance(lv.highlighted_child, TodoItem):
-            todo_id = lv.highlighted_child.todo["id"]
-            async with httpx.AsyncClient() as client:
-                await client.delete(f"{API_BASE}/{todo_id}")
-            await self.refresh_todos()
+            todo = lv.highlighted_child.todo
+            reply = await self._send("DELETE", f"{API_BASE}/{todo['id']}")
+            if reply is not None:
+                await self._remove(todo["id"])
+                await self._apply_counts(todo["category"], reply)
 
     async def action_refresh(self) -> None:
         await self.refresh_todos()